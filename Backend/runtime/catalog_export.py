@@ -0,0 +1,63 @@
+import io
+import gzip
+import json
+from music_items import decode_item
+
+# Parquet needs pyarrow, which is not in the Lambda runtime; without it
+# catalog files are written as gzip-compressed NDJSON instead.
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CATALOG_PREFIX = 'analytics/catalog'
+
+CATALOG_COLUMNS = (
+    ('music_id', 'string'),
+    ('title', 'string'),
+    ('artist', 'string'),
+    ('album', 'string'),
+    ('duration', 'int64'),
+    ('uploaded_at', 'string'),
+    ('user_id', 'string'),
+    ('username', 'string'),
+    ('s3_key', 'string'),
+)
+
+def to_catalog_row(item, bucket_name):
+    """Flat analytics row from a stored v1 or v2 music item."""
+    music = decode_item(item, bucket_name)
+    row = {name: music.get(name) for name, _ in CATALOG_COLUMNS}
+    if row['duration'] is not None:
+        row['duration'] = int(row['duration'])
+    return row
+
+def upload_month(row):
+    """Partition value (YYYY-MM) for a catalog row."""
+    return (row.get('uploaded_at') or 'unknown')[:7]
+
+def resolve_format(file_format):
+    if file_format == 'auto':
+        return 'parquet' if pyarrow else 'ndjson'
+    if file_format == 'parquet' and not pyarrow:
+        raise Exception("Parquet output requires pyarrow; use --format ndjson")
+    return file_format
+
+def encode_rows(rows, file_format):
+    """Serialise rows to (bytes, file extension) in the requested format."""
+    if file_format == 'parquet':
+        schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in CATALOG_COLUMNS])
+        buffer = io.BytesIO()
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows, schema=schema), buffer, compression='zstd')
+        return buffer.getvalue(), 'parquet'
+
+    return encode_ndjson(rows), 'ndjson.gz'
+
+def encode_ndjson(records):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+        for record in records:
+            f.write(json.dumps(record, default=str).encode('utf-8'))
+            f.write(b'\n')
+    return buffer.getvalue()
@@ -0,0 +1,56 @@
+import boto3
+import os
+import datetime
+from boto3.dynamodb.types import TypeDeserializer
+from catalog_export import CATALOG_PREFIX, to_catalog_row, encode_ndjson
+
+s3 = boto3.client('s3')
+deserializer = TypeDeserializer()
+
+def deserialize(image):
+    return {key: deserializer.deserialize(value) for key, value in image.items()}
+
+def handler(event, context):
+    """
+    DynamoDB Streams handler for the music table
+    Appends each batch of changes to the analytics bucket as one gzip NDJSON file,
+    so the catalog snapshot can be brought up to date without scanning the table
+    Replaying changes in sequence_number order over a snapshot gives the current catalog
+    """
+    ANALYTICS_BUCKET_NAME = os.environ['ANALYTICS_BUCKET_NAME']
+    BUCKET_NAME = os.environ['BUCKET_NAME']
+
+    changes = []
+    for record in event.get('Records', []):
+        stream_record = record['dynamodb']
+        change = {
+            'op': record['eventName'],
+            'sequence_number': stream_record['SequenceNumber'],
+            'changed_at': datetime.datetime.utcfromtimestamp(
+                stream_record['ApproximateCreationDateTime']
+            ).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'music_id': deserialize(stream_record['Keys'])['music_id'],
+            'row': None
+        }
+        if 'NewImage' in stream_record:
+            change['row'] = to_catalog_row(deserialize(stream_record['NewImage']), BUCKET_NAME)
+        changes.append(change)
+
+    if not changes:
+        return {'written': 0}
+
+    # Keyed by the batch's own sequence numbers so a retried batch overwrites itself
+    changed_at = changes[0]['changed_at']
+    key = (
+        f"{CATALOG_PREFIX}/changes/dt={changed_at[:10]}/hour={changed_at[11:13]}/"
+        f"{changes[0]['sequence_number']}-{changes[-1]['sequence_number']}.ndjson.gz"
+    )
+    s3.put_object(
+        Bucket=ANALYTICS_BUCKET_NAME,
+        Key=key,
+        Body=encode_ndjson(changes),
+        ContentType='application/gzip'
+    )
+    print(f"Wrote {len(changes)} catalog change(s) to s3://{ANALYTICS_BUCKET_NAME}/{key}")
+
+    return {'written': len(changes)}
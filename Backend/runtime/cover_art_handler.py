@@ -0,0 +1,282 @@
+import boto3
+import io
+import hashlib
+import os
+import re
+import urllib.parse
+import zlib
+from botocore.exceptions import ClientError
+from music_items import COVER_PREFIX, COVER_SIZES, cover_path, cover_keys, decode_item
+from subscriptions import publish_music_created
+
+# Pillow comes from the imaging layer; without it covers are skipped
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+s3 = boto3.client('s3')
+dynamodb = boto3.resource('dynamodb')
+
+ID3_HEADER_BYTES = 10
+# Tags larger than this are almost certainly not worth pulling for a thumbnail
+MAX_TAG_BYTES = 16 * 1024 * 1024
+FRONT_COVER = 3
+
+# Frame format flags (second flag byte of a v2.3/v2.4 frame header)
+V24_GROUPING, V24_COMPRESSED, V24_ENCRYPTED, V24_UNSYNC, V24_DATA_LENGTH = 0x40, 0x08, 0x04, 0x02, 0x01
+V23_COMPRESSED, V23_ENCRYPTED, V23_GROUPING = 0x80, 0x40, 0x20
+# Safe because every version of a cover gets its own directory
+COVER_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+MUSIC_KEY = re.compile(r'^music/(?:[^/]+/)?(?P<music_id>[^/]+)\.mp3$')
+
+def syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+def read_range(bucket, key, start, length):
+    response = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{start + length - 1}")
+    return response['Body'].read()
+
+def terminator(encoding):
+    return b'\x00\x00' if encoding in (1, 2) else b'\x00'
+
+def split_terminated(data, encoding):
+    """Split off a text field ended by the encoding's null terminator."""
+    end = terminator(encoding)
+    index = data.find(end)
+    # UTF-16 terminators must start on a character boundary
+    while len(end) == 2 and index != -1 and index % 2:
+        index = data.find(end, index + 1)
+    if index == -1:
+        return data, b''
+    return data[:index], data[index + len(end):]
+
+def parse_picture(frame_id, body):
+    """(picture_type, image bytes) from an APIC (v2.3/2.4) or PIC (v2.2) frame body."""
+    encoding = body[0]
+    if frame_id == 'PIC':
+        rest = body[4:]
+    else:
+        _, rest = split_terminated(body[1:], 0)
+    picture_type = rest[0]
+    _, data = split_terminated(rest[1:], encoding)
+    return picture_type, data
+
+def inflate(body):
+    """zlib-decompress a frame body, or None if it would exceed MAX_TAG_BYTES."""
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(body, MAX_TAG_BYTES)
+    if len(data) >= MAX_TAG_BYTES or decompressor.unconsumed_tail:
+        return None
+    return data
+
+def frame_data(body, flags, major):
+    """
+    Frame body with its format flags undone, or None for an encrypted frame
+    or one that decompresses to more than MAX_TAG_BYTES.
+    Optional header bytes precede the data in spec order: v2.4 group id then
+    data length indicator, v2.3 decompressed size then group id.
+    """
+    if major == 4:
+        if flags & V24_ENCRYPTED:
+            return None
+        if flags & V24_UNSYNC:
+            body = body.replace(b'\xff\x00', b'\xff')
+        if flags & V24_GROUPING:
+            body = body[1:]
+        if flags & V24_DATA_LENGTH:
+            body = body[4:]
+        if flags & V24_COMPRESSED:
+            body = inflate(body)
+    elif major == 3:
+        if flags & V23_ENCRYPTED:
+            return None
+        if flags & V23_COMPRESSED:
+            body = body[4:]
+        if flags & V23_GROUPING:
+            body = body[1:]
+        if flags & V23_COMPRESSED:
+            body = inflate(body)
+    return body
+
+def find_cover(tag, major):
+    """Image bytes of the front cover (or first picture) in an ID3v2 tag body."""
+    if major == 2:
+        header_size, id_size, picture_frame = 6, 3, 'PIC'
+    else:
+        header_size, id_size, picture_frame = 10, 4, 'APIC'
+
+    pictures = []
+    offset = 0
+    while offset + header_size <= len(tag):
+        frame_id = tag[offset:offset + id_size]
+        if not frame_id.strip(b'\x00'):
+            break  # padding
+        size_bytes = tag[offset + id_size:offset + id_size * 2]
+        if major == 2:
+            size = int.from_bytes(size_bytes, 'big')
+        elif major == 4:
+            size = syncsafe(size_bytes)
+        else:
+            size = int.from_bytes(size_bytes, 'big')
+
+        body = tag[offset + header_size:offset + header_size + size]
+        if frame_id.decode('latin-1') == picture_frame:
+            if major > 2:
+                body = frame_data(body, tag[offset + 9], major)
+            if body:
+                picture_type, data = parse_picture(picture_frame, body)
+                if picture_type == FRONT_COVER:
+                    return data
+                pictures.append(data)
+        offset += header_size + size
+
+    return pictures[0] if pictures else None
+
+def extract_cover(bucket, key):
+    """
+    Read only the ID3v2 tag with ranged GETs (never the audio) and return the
+    embedded cover image, or None.
+    """
+    header = read_range(bucket, key, 0, ID3_HEADER_BYTES)
+    if len(header) < ID3_HEADER_BYTES or header[:3] != b'ID3':
+        return None
+
+    major, flags = header[3], header[5]
+    tag_size = syncsafe(header[6:10])
+    if major not in (2, 3, 4) or tag_size > MAX_TAG_BYTES:
+        print(f"Skipping ID3v2.{major} tag of {tag_size} bytes in {key}")
+        return None
+
+    tag = read_range(bucket, key, ID3_HEADER_BYTES, tag_size)
+    if major < 4 and flags & 0x80:
+        tag = tag.replace(b'\xff\x00', b'\xff')
+    if flags & 0x40 and major > 2:
+        extended_size = syncsafe(tag[:4]) if major == 4 else int.from_bytes(tag[:4], 'big') + 4
+        tag = tag[extended_size:]
+
+    return find_cover(tag, major)
+
+def cover_version(image_bytes):
+    """Content hash naming the cover's directory, so a changed cover gets new URLs."""
+    return hashlib.sha256(image_bytes).hexdigest()[:16]
+
+def write_thumbnails(bucket, music_id, version, image_bytes):
+    """Square WebP and JPEG thumbnails at every COVER_SIZES under covers/<music_id>/<version>/."""
+    image = Image.open(io.BytesIO(image_bytes))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    for size in COVER_SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for extension, content_type, options in (
+            ('webp', 'image/webp', {'format': 'WEBP', 'quality': 80, 'method': 6}),
+            ('jpg', 'image/jpeg', {'format': 'JPEG', 'quality': 80, 'optimize': True, 'progressive': True}),
+        ):
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, **options)
+            s3.put_object(
+                Bucket=bucket,
+                Key=f"{COVER_PREFIX}/{cover_path(music_id, version)}/{size}.{extension}",
+                Body=buffer.getvalue(),
+                ContentType=content_type,
+                CacheControl=COVER_CACHE_CONTROL
+            )
+
+def delete_thumbnails(bucket, music_id, version):
+    response = s3.delete_objects(
+        Bucket=bucket,
+        Delete={'Objects': [{'Key': key} for key in cover_keys(music_id, version)], 'Quiet': True}
+    )
+    # Quiet mode only reports the keys that could not be deleted
+    for error in response.get('Errors', []):
+        print(f"Warning: Could not delete cover object {error['Key']}: {error.get('Message')}")
+
+def set_cover_version(table, music_id, version):
+    """
+    Point the row at a new cover version (None removes it) and return the row
+    as it was before, whose cv is the version it replaced.
+    """
+    kwargs = {
+        'Key': {'music_id': music_id},
+        'ConditionExpression': 'attribute_exists(music_id)',
+        'ReturnValues': 'ALL_OLD'
+    }
+    if version:
+        kwargs['UpdateExpression'] = 'SET cv = :cv'
+        kwargs['ExpressionAttributeValues'] = {':cv': version}
+    else:
+        kwargs['UpdateExpression'] = 'REMOVE cv'
+    response = table.update_item(**kwargs)
+    return response['Attributes']
+
+def handler(event, context):
+    """
+    S3 ObjectCreated handler for music/ uploads
+    Extracts the ID3 APIC cover with ranged reads, writes small thumbnails under
+    covers/<music_id>/<content hash>/ and points the track's cv at them, so
+    replacing a file never leaves clients or the CDN on the old art.
+    The upload is complete once its object exists, so this is also where new
+    tracks are published to onMusicCreated / onMyMusicChanged subscribers.
+    """
+    TABLE_NAME = os.environ['TABLE_NAME']
+    BUCKET_NAME = os.environ['BUCKET_NAME']
+    table = dynamodb.Table(TABLE_NAME)
+
+    if Image is None:
+        print("Warning: Pillow not available, skipping cover art")
+
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        key = urllib.parse.unquote_plus(record['s3']['object']['key'])
+        match = MUSIC_KEY.match(key)
+        if not match:
+            continue
+        music_id = match.group('music_id')
+
+        if Image is None:
+            # Leave any existing cover alone and just announce the track
+            row = table.get_item(Key={'music_id': music_id}).get('Item')
+            if row:
+                publish_music_created(decode_item(row, BUCKET_NAME))
+            continue
+
+        version = None
+        try:
+            image_bytes = extract_cover(bucket, key)
+            if image_bytes:
+                version = cover_version(image_bytes)
+                write_thumbnails(bucket, music_id, version, image_bytes)
+            else:
+                print(f"No cover art in {key}")
+        except Exception as e:
+            # A malformed tag or image must not fail the upload pipeline
+            print(f"Warning: Could not extract cover art from {key}: {e}")
+            version = None
+
+        try:
+            row = set_cover_version(table, music_id, version)
+        except ClientError as e:
+            print(f"Warning: Could not update cover for {music_id}: {e}")
+            # The track was deleted while its thumbnails were being written
+            if version and e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                try:
+                    delete_thumbnails(bucket, music_id, version)
+                except ClientError as e:
+                    print(f"Warning: Could not delete cover {version} for {music_id}: {e}")
+            continue
+
+        if version:
+            print(f"Cover art {version} stored for {music_id}")
+        # A replaced file's old art is no longer referenced by the row
+        previous = row.pop('cv', None)
+        if previous and previous != version:
+            try:
+                delete_thumbnails(bucket, music_id, previous)
+            except ClientError as e:
+                print(f"Warning: Could not delete old cover {previous} for {music_id}: {e}")
+
+        if version:
+            row['cv'] = version
+        # publish_music_created logs and swallows its own failures
+        publish_music_created(decode_item(row, BUCKET_NAME))
@@ -2,6 +2,7 @@ import json
 import os
 import boto3
 from botocore.exceptions import ClientError
+from music_items import decode_item, cover_keys
 
 s3 = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
@@ -52,14 +53,14 @@ def handler(event, context):
         if 'Item' not in response:
             raise Exception(f'Music with id {music_id} not found')
         
-        item = response['Item']
+        item = decode_item(response['Item'], BUCKET_NAME)
         
         if item.get('user_id') != user_id:
             raise Exception('You do not have permission to delete this track')
         
         table.delete_item(Key={'music_id': music_id})
         
-        s3_key = item.get('s3_key', f"music/{music_id}.mp3")
+        s3_key = item['s3_key']
         
         try:
             s3.delete_object(Bucket=BUCKET_NAME, Key=s3_key)
@@ -67,11 +68,35 @@ def handler(event, context):
         except ClientError as e:
             print(f"Warning: Could not delete S3 object {s3_key}: {e}")
         
+        # Thumbnails are served publicly by the covers CDN until removed
+        cover_version = response['Item'].get('cv')
+        if cover_version:
+            try:
+                delete_response = s3.delete_objects(
+                    Bucket=BUCKET_NAME,
+                    Delete={'Objects': [{'Key': key} for key in cover_keys(music_id, cover_version)], 'Quiet': True}
+                )
+                # Quiet mode only reports the keys that could not be deleted
+                errors = delete_response.get('Errors', [])
+                for error in errors:
+                    print(f"Warning: Could not delete cover object {error['Key']}: {error.get('Message')}")
+                if not errors:
+                    print(f"Deleted cover art {cover_version} for {music_id}")
+            except ClientError as e:
+                print(f"Warning: Could not delete cover art for {music_id}: {e}")
+        
+        # user_id/change feed the onMusicDeleted and onMyMusicChanged subscriptions
         return {
             'music_id': item['music_id'],
             'title': item.get('title', ''),
             'artist': item.get('artist', ''),
             'album': item.get('album', ''),
+            'duration': item.get('duration'),
+            'file_url': item['file_url'],
+            'uploaded_at': item.get('uploaded_at'),
+            'user_id': item['user_id'],
+            'username': item.get('username'),
+            'change': 'DELETED',
             'message': 'Music deleted successfully'
         }
         
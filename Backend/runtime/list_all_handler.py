@@ -1,37 +1,217 @@
 import boto3
 import os
 import json
-from botocore.config import Config
+import base64
+import heapq
+import itertools
+import datetime
+import collections
+import re
+from concurrent.futures import ThreadPoolExecutor
+from upload_buckets import UPLOAD_SHARDS, UPLOADED_AT_INDEX, bucket_month, month_buckets, previous_month
+from music_items import music_from_attributes
 
-dynamodb = boto3.resource('dynamodb')
-s3 = boto3.client('s3', config=Config(signature_version='s3v4'))
+# Low-level client: rows are decoded straight from AttributeValue maps into
+# slotted Music records, skipping TypeDeserializer and Decimal
+dynamodb = boto3.client('dynamodb')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Oldest month NEWEST walks back to; backfill_upload_buckets.py reports the
+# month of the oldest track
+CATALOG_START_MONTH = os.environ.get('CATALOG_START_MONTH', '2024-01')
+# Each month costs UPLOAD_SHARDS concurrent queries; a page that runs out of
+# months returns what it has plus a cursor instead of walking on
+MAX_MONTHS_PER_PAGE = 6
+
+# Shard queries for a month run concurrently; reused across warm invocations
+shard_pool = ThreadPoolExecutor(max_workers=UPLOAD_SHARDS)
+
+# uploaded_at is written by upload_handler in this UTC format
+UPLOADED_AT_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+# Seconds fraction of an AWSDateTime; Python 3.9 only parses 3 or 6 digits
+FRACTION = re.compile(r'(?<=:\d\d)\.(\d+)')
+
+def encode_token(data):
+    return base64.urlsafe_b64encode(json.dumps(data, default=str).encode('utf-8')).decode('ascii')
+
+def decode_token(token):
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise Exception('Invalid nextToken')
+
+def normalize_since(since):
+    """
+    An AWSDateTime ("Z" or a "+02:00" style offset) as a UTC uploaded_at
+    string, so it compares correctly against stored timestamps and months.
+    """
+    text = FRACTION.sub(lambda match: '.' + match.group(1)[:6].ljust(6, '0'), since.replace('Z', '+00:00'))
+    try:
+        parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise Exception('since must be an ISO 8601 date-time')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed.strftime(UPLOADED_AT_FORMAT)
+
+def start_key(bucket, position):
+    """ExclusiveStartKey resuming a partition after (uploaded_at, music_id)."""
+    uploaded_at, music_id = position
+    return {
+        'upload_bucket': {'S': bucket},
+        'uploaded_at': {'S': uploaded_at},
+        'music_id': {'S': music_id}
+    }
+
+def query_bucket(table_name, bucket, since, position, limit):
+    """
+    Up to `limit` newest-first records from one UploadedAtIndex partition, no
+    older than `since`, resuming after `position` when given.
+    Returns (records, exhausted).
+    """
+    condition = 'upload_bucket = :bucket'
+    values = {':bucket': {'S': bucket}}
+    if since:
+        condition += ' AND uploaded_at >= :since'
+        values[':since'] = {'S': since}
+
+    kwargs = {
+        'TableName': table_name,
+        'IndexName': UPLOADED_AT_INDEX,
+        'KeyConditionExpression': condition,
+        'ExpressionAttributeValues': values,
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    if position:
+        kwargs['ExclusiveStartKey'] = start_key(bucket, position)
+
+    items = []
+    while True:
+        response = dynamodb.query(**kwargs)
+        items.extend(music_from_attributes(item) for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items, True
+        if len(items) >= limit:
+            return items, False
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        kwargs['Limit'] = limit - len(items)
+
+def read_month(table_name, month, since, after, done, limit):
+    """
+    k-way merge of one month's shard queries into at most `limit` records.
+    `after` (shard -> last returned (uploaded_at, music_id)) and `done`
+    (exhausted shards) are advanced in place past the records returned.
+    """
+    buckets = month_buckets(month)
+    shards = [shard for shard in range(len(buckets)) if shard not in done]
+    pages = list(shard_pool.map(
+        lambda shard: query_bucket(table_name, buckets[shard], since, after.get(shard), limit),
+        shards
+    ))
+
+    merged = heapq.merge(
+        *([(music, shard) for music in records] for shard, (records, _) in zip(shards, pages)),
+        key=lambda entry: entry[0].uploaded_at,
+        reverse=True
+    )
+    items = []
+    taken = collections.Counter()
+    for music, shard in itertools.islice(merged, limit):
+        items.append(music)
+        after[shard] = (music.uploaded_at, music.music_id)
+        taken[shard] += 1
+
+    for shard, (records, exhausted) in zip(shards, pages):
+        if exhausted and taken[shard] == len(records):
+            done.add(shard)
+    return items
+
+def list_newest(table_name, since, limit, next_token):
+    """
+    Walk upload months backwards, k-way merging each month's shard queries,
+    until the page is full. The cursor keeps each shard's last
+    (uploaded_at, music_id), so tracks sharing a timestamp (a batch upload)
+    are never skipped. A page walks at most MAX_MONTHS_PER_PAGE months; a
+    short page still carries a cursor until CATALOG_START_MONTH is reached.
+    """
+    if next_token:
+        cursor = decode_token(next_token)
+        if 'month' not in cursor:
+            raise Exception('Invalid nextToken')
+        month = cursor['month']
+        after = {int(shard): tuple(position) for shard, position in cursor['after'].items()}
+        done = set(cursor['done'])
+    else:
+        month = datetime.datetime.utcnow().strftime('%Y-%m')
+        after, done = {}, set()
+
+    floor_month = max(bucket_month(since), CATALOG_START_MONTH) if since else CATALOG_START_MONTH
+
+    items = []
+    months_read = 0
+    while len(items) < limit and month >= floor_month and months_read < MAX_MONTHS_PER_PAGE:
+        items.extend(read_month(table_name, month, since, after, done, limit - len(items)))
+        months_read += 1
+        if len(done) == UPLOAD_SHARDS:
+            month, after, done = previous_month(month), {}, set()
+
+    token = None
+    if month >= floor_month:
+        token = encode_token({'month': month, 'after': after, 'done': sorted(done)})
+    return items, token
+
+def list_scan(table_name, limit, next_token):
+    """Unordered listing in table hash order."""
+    kwargs = {'TableName': table_name}
+    if limit:
+        kwargs['Limit'] = limit
+    if next_token:
+        start_key = decode_token(next_token)
+        # Keys are AttributeValue maps; anything else predates the low-level client
+        if not all(isinstance(value, dict) for value in start_key.values()):
+            raise Exception('Invalid nextToken')
+        kwargs['ExclusiveStartKey'] = start_key
+
+    response = dynamodb.scan(**kwargs)
+    items = [music_from_attributes(item) for item in response.get('Items', [])]
+    token = encode_token(response['LastEvaluatedKey']) if 'LastEvaluatedKey' in response else None
+    return items, token
 
 def handler(event, context):
     """
     AppSync Lambda handler for listAllMusic query
-    Returns list of all music from all users with presigned streaming URLs
+    Returns a page of music from all users; streaming URLs are issued on demand by getStreamUrls
     Read-only access for discovery/explore functionality
+    order: NEWEST pages newest-first through UploadedAtIndex; otherwise the table is scanned
     """
     TABLE_NAME = os.environ['TABLE_NAME']
     BUCKET_NAME = os.environ['BUCKET_NAME']
-    table = dynamodb.Table(TABLE_NAME)
 
     identity = event.get('identity', {})
     claims = identity.get('claims', {})
     user_id = claims.get('sub') or identity.get('sub')
-    
+
     print(f"ListAllMusic called by user: {user_id or 'anonymous'}")
 
-    # Get all music from all users
-    response = table.scan()
-    items = response.get('Items', [])
+    arguments = event.get('arguments', {})
+    order = arguments.get('order')
+    since = arguments.get('since')
+    limit = arguments.get('limit')
+    next_token = arguments.get('nextToken')
 
-    for item in items:
-        if 's3_key' in item:
-            item['stream_url'] = s3.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': BUCKET_NAME, 'Key': item['s3_key']},
-                ExpiresIn=3600
-            )
+    if limit is not None and limit < 1:
+        raise Exception('limit must be a positive integer')
 
-    return items
+    if order == 'NEWEST':
+        if since:
+            since = normalize_since(since)
+        items, token = list_newest(TABLE_NAME, since, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE), next_token)
+    else:
+        items, token = list_scan(TABLE_NAME, limit, next_token)
+
+    return {
+        'items': [music.to_response(BUCKET_NAME) for music in items],
+        'nextToken': token
+    }
@@ -1,20 +1,19 @@
 import boto3
 import os
 import json
-from boto3.dynamodb.conditions import Key
-from botocore.config import Config
+from music_items import music_from_attributes
 
-dynamodb = boto3.resource('dynamodb')
-s3 = boto3.client('s3', config=Config(signature_version='s3v4'))
+# Low-level client: rows are decoded straight from AttributeValue maps
+dynamodb = boto3.client('dynamodb')
 
 def handler(event, context):
     """
     AppSync Lambda handler for listMusic query
-    Returns list of music for the authenticated user with presigned streaming URLs
+    Returns list of music for the authenticated user
+    Streaming URLs are issued on demand by getStreamUrls
     """
     TABLE_NAME = os.environ['TABLE_NAME']
     BUCKET_NAME = os.environ['BUCKET_NAME']
-    table = dynamodb.Table(TABLE_NAME)
 
     # Extract user identity from AppSync context
     identity = event.get('identity', {})
@@ -29,18 +28,12 @@ def handler(event, context):
     if not user_id:
         raise Exception("User not authenticated - no user_id found in request")
 
-    response = table.scan(
-        FilterExpression='user_id = :uid',
-        ExpressionAttributeValues={':uid': user_id}
+    # user_id is stored as 'u' in compact rows
+    response = dynamodb.scan(
+        TableName=TABLE_NAME,
+        FilterExpression='user_id = :uid OR u = :uid',
+        ExpressionAttributeValues={':uid': {'S': user_id}}
     )
     items = response.get('Items', [])
 
-    for item in items:
-        if 's3_key' in item:
-            item['stream_url'] = s3.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': BUCKET_NAME, 'Key': item['s3_key']},
-                ExpiresIn=3600
-            )
-
-    return items
\ No newline at end of file
+    return [music_from_attributes(item).to_response(BUCKET_NAME) for item in items]
\ No newline at end of file
@@ -0,0 +1,164 @@
+# Row layouts in the music table:
+#   v1 (legacy): long attribute names, file_url and s3_key always stored
+#   v2 (compact): short attribute names, file_url derived from s3_key, s3_key
+#                 only stored ('k') when it is not music/<user_id>/<music_id>.mp3
+# Readers accept both while the compact_items migration is running.
+# Either layout may carry 'cv' once cover_art_handler has stored thumbnails:
+# a content hash string naming the covers/<music_id>/<cv>/ directory.
+
+import os
+
+SCHEMA_VERSION = 2
+
+# CloudFront domain serving the covers/ prefix
+COVERS_DOMAIN = os.environ.get('COVERS_DOMAIN')
+COVER_PREFIX = 'covers'
+COVER_SIZES = (64, 160, 320)
+COVER_FORMATS = ('webp', 'jpg')
+# Listings point at the tile-sized WebP
+COVER_TILE = '160.webp'
+
+# Long (API) name -> compact attribute name. music_id, uploaded_at and
+# upload_bucket keep their names because they are table/index keys.
+COMPACT_FIELDS = {
+    'title': 't',
+    'artist': 'ar',
+    'album': 'al',
+    'duration': 'd',
+    'user_id': 'u',
+    'username': 'un',
+}
+
+def canonical_s3_key(user_id, music_id):
+    return f"music/{user_id}/{music_id}.mp3"
+
+def file_url_for(bucket_name, s3_key):
+    return f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
+
+def cover_path(music_id, cover_version):
+    """Directory of a track's thumbnails, relative to covers/."""
+    return f"{music_id}/{cover_version}"
+
+def cover_keys(music_id, cover_version):
+    """Every thumbnail object cover_art_handler writes for one cover version."""
+    base = f"{COVER_PREFIX}/{cover_path(music_id, cover_version)}"
+    return [f"{base}/{size}.{extension}" for size in COVER_SIZES for extension in COVER_FORMATS]
+
+def cover_url_for(music_id, cover_version):
+    if not COVERS_DOMAIN:
+        return None
+    return f"https://{COVERS_DOMAIN}/{cover_path(music_id, cover_version)}/{COVER_TILE}"
+
+def item_version(item):
+    return int(item.get('v', 1))
+
+def encode_item(music):
+    """Compact (v2) row for a track given in long form."""
+    item = {
+        'music_id': music['music_id'],
+        'v': SCHEMA_VERSION,
+        'uploaded_at': music['uploaded_at'],
+    }
+    for field, attribute in COMPACT_FIELDS.items():
+        value = music.get(field)
+        if value is not None and value != '':
+            item[attribute] = value
+
+    s3_key = music.get('s3_key')
+    if s3_key and s3_key != canonical_s3_key(music.get('user_id'), music['music_id']):
+        item['k'] = s3_key
+    if music.get('upload_bucket'):
+        item['upload_bucket'] = music['upload_bucket']
+    if music.get('cv'):
+        item['cv'] = music['cv']
+    return item
+
+def decode_item(item, bucket_name):
+    """Long-form track (the Music shape plus s3_key) from a v1 or v2 row."""
+    if item_version(item) < SCHEMA_VERSION:
+        music = {key: value for key, value in item.items() if key not in ('upload_bucket', 'cv')}
+        music.setdefault('s3_key', f"music/{item['music_id']}.mp3")
+        music.setdefault('file_url', file_url_for(bucket_name, music['s3_key']))
+        if item.get('cv'):
+            music['cover_url'] = cover_url_for(item['music_id'], item['cv'])
+        return music
+
+    music = {field: item[attribute] for field, attribute in COMPACT_FIELDS.items() if attribute in item}
+    music['music_id'] = item['music_id']
+    music['uploaded_at'] = item['uploaded_at']
+    music.setdefault('album', '')
+    music['s3_key'] = item.get('k') or canonical_s3_key(music.get('user_id'), item['music_id'])
+    music['file_url'] = file_url_for(bucket_name, music['s3_key'])
+    if item.get('cv'):
+        music['cover_url'] = cover_url_for(item['music_id'], item['cv'])
+    return music
+
+# Low-level read path: list handlers scan/query with the DynamoDB client and
+# decode AttributeValue maps straight into Music records, skipping
+# TypeDeserializer, Decimal and the intermediate long-form dict.
+
+LEGACY_FIELDS = {field: field for field in COMPACT_FIELDS}
+
+class Music:
+    __slots__ = (
+        'music_id', 'title', 'artist', 'album', 'duration', 'uploaded_at',
+        'user_id', 'username', 's3_key', 'file_url', 'cover_version'
+    )
+
+    def to_response(self, bucket_name):
+        """The AppSync Music shape."""
+        return {
+            'music_id': self.music_id,
+            'title': self.title,
+            'artist': self.artist,
+            'album': self.album,
+            'duration': self.duration,
+            'file_url': self.file_url or file_url_for(bucket_name, self.s3_key),
+            'uploaded_at': self.uploaded_at,
+            'user_id': self.user_id,
+            'username': self.username,
+            'cover_url': cover_url_for(self.music_id, self.cover_version) if self.cover_version else None
+        }
+
+def number(value):
+    text = value['N']
+    return int(text) if text.lstrip('-').isdigit() else float(text)
+
+def music_from_attributes(attributes):
+    """Music record from a low-level (AttributeValue) v1 or v2 row."""
+    get = attributes.get
+    version = get('v')
+    compact = version is not None and int(version['N']) >= SCHEMA_VERSION
+    names = COMPACT_FIELDS if compact else LEGACY_FIELDS
+
+    music = Music()
+    music.music_id = music_id = attributes['music_id']['S']
+    music.uploaded_at = get('uploaded_at', {}).get('S')
+
+    value = get(names['title'])
+    music.title = value['S'] if value else None
+    value = get(names['artist'])
+    music.artist = value['S'] if value else None
+    value = get(names['album'])
+    # Compact rows drop empty albums
+    music.album = value['S'] if value else ('' if compact else None)
+    value = get(names['duration'])
+    music.duration = number(value) if value and 'N' in value else None
+    value = get(names['user_id'])
+    music.user_id = user_id = value['S'] if value else None
+    value = get(names['username'])
+    music.username = value['S'] if value else None
+
+    if compact:
+        value = get('k')
+        music.s3_key = value['S'] if value else canonical_s3_key(user_id, music_id)
+        music.file_url = None
+    else:
+        value = get('s3_key')
+        music.s3_key = value['S'] if value else f"music/{music_id}.mp3"
+        value = get('file_url')
+        music.file_url = value['S'] if value else None
+
+    value = get('cv')
+    music.cover_version = value['S'] if value else None
+    return music
@@ -0,0 +1,116 @@
+import boto3
+import os
+import time
+import random
+import datetime
+from collections import OrderedDict
+from botocore.config import Config
+from music_items import music_from_attributes
+
+dynamodb = boto3.client('dynamodb')
+s3 = boto3.client('s3', config=Config(signature_version='s3v4'))
+
+STREAM_URL_TTL_SECONDS = 3600
+# Cached URLs are reissued once they have less than this left, so a client
+# never receives a URL that expires mid-track
+MIN_REMAINING_SECONDS = 900
+MAX_CACHED_URLS = 2000
+# BatchGetItem limit
+MAX_MUSIC_IDS = 100
+# UnprocessedKeys (throttling) are retried with jittered exponential backoff
+# starting here; tracks still unprocessed after the last attempt get no URL
+# and the client simply asks again
+BATCH_GET_ATTEMPTS = 5
+BATCH_GET_BACKOFF_SECONDS = 0.05
+
+# music_id -> (stream_url, expires_epoch), kept across warm invocations
+url_cache = OrderedDict()
+
+def cached_url(music_id, now):
+    entry = url_cache.get(music_id)
+    if not entry or entry[1] - now < MIN_REMAINING_SECONDS:
+        return None
+    url_cache.move_to_end(music_id)
+    return entry
+
+def cache_url(music_id, url, expires_at):
+    url_cache[music_id] = (url, expires_at)
+    url_cache.move_to_end(music_id)
+    while len(url_cache) > MAX_CACHED_URLS:
+        url_cache.popitem(last=False)
+
+def fetch_s3_keys(table_name, music_ids):
+    """music_id -> s3_key for the given tracks, via BatchGetItem."""
+    keys = {}
+    request = {
+        table_name: {
+            'Keys': [{'music_id': {'S': music_id}} for music_id in music_ids],
+            # Legacy rows store s3_key; compact rows store k or derive it from u
+            'ProjectionExpression': 'music_id, v, s3_key, k, u, uploaded_at'
+        }
+    }
+    for attempt in range(BATCH_GET_ATTEMPTS):
+        if attempt:
+            time.sleep(BATCH_GET_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response.get('Responses', {}).get(table_name, []):
+            music = music_from_attributes(item)
+            keys[music.music_id] = music.s3_key
+        request = response.get('UnprocessedKeys')
+        if not request:
+            return keys
+
+    print(f"Warning: {len(request[table_name]['Keys'])} track(s) still unprocessed after {BATCH_GET_ATTEMPTS} attempts")
+    return keys
+
+def handler(event, context):
+    """
+    AppSync Lambda handler for getStreamUrls query
+    Presigns streaming URLs only for the tracks a client is about to play or has queued
+    Recently issued URLs are reused from a per-container cache
+    """
+    TABLE_NAME = os.environ['TABLE_NAME']
+    BUCKET_NAME = os.environ['BUCKET_NAME']
+
+    identity = event.get('identity', {})
+    claims = identity.get('claims', {})
+    user_id = claims.get('sub') or identity.get('sub')
+
+    arguments = event.get('arguments', {})
+    music_ids = list(dict.fromkeys(arguments.get('music_ids') or []))
+
+    print(f"GetStreamUrls called by user: {user_id or 'anonymous'} for {len(music_ids)} track(s)")
+
+    if len(music_ids) > MAX_MUSIC_IDS:
+        raise Exception(f"At most {MAX_MUSIC_IDS} music_ids can be requested at once")
+
+    now = int(time.time())
+    urls = {}
+    missing = []
+    for music_id in music_ids:
+        entry = cached_url(music_id, now)
+        if entry:
+            urls[music_id] = entry
+        else:
+            missing.append(music_id)
+
+    if missing:
+        expires_at = now + STREAM_URL_TTL_SECONDS
+        for music_id, s3_key in fetch_s3_keys(TABLE_NAME, missing).items():
+            url = s3.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': BUCKET_NAME, 'Key': s3_key},
+                ExpiresIn=STREAM_URL_TTL_SECONDS
+            )
+            cache_url(music_id, url, expires_at)
+            urls[music_id] = (url, expires_at)
+
+    return [
+        {
+            'music_id': music_id,
+            'stream_url': urls[music_id][0],
+            'expires_at': datetime.datetime.utcfromtimestamp(urls[music_id][1]).strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+        for music_id in music_ids
+        if music_id in urls
+    ]
@@ -0,0 +1,84 @@
+import os
+import json
+import decimal
+import urllib.request
+import boto3
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+
+session = boto3.Session()
+
+PUBLISH_MUSIC_CREATED = """
+mutation PublishMusicCreated($music: MusicInput!) {
+  publishMusicCreated(music: $music) {
+    music_id
+    title
+    artist
+    album
+    duration
+    file_url
+    uploaded_at
+    user_id
+    username
+    cover_url
+    change
+  }
+}
+"""
+
+MUSIC_INPUT_FIELDS = (
+    'music_id', 'title', 'artist', 'album', 'duration', 'file_url',
+    'uploaded_at', 'user_id', 'username', 'cover_url'
+)
+
+# Well under cover_fn's timeout, which also covers thumbnailing
+PUBLISH_TIMEOUT_SECONDS = 2
+
+def json_default(value):
+    # Rows read through the DynamoDB resource carry numbers as Decimal
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+def publish_music_created(item):
+    """
+    Fan a newly created track out to onMusicCreated / onMyMusicChanged subscribers.
+    createMusic itself cannot be the subscription trigger because its response
+    carries the uploader's presigned PUT URL (and the file is not there yet), so
+    cover_art_handler calls the IAM-only publishMusicCreated mutation with the
+    public track fields once the upload has landed.
+    Failures are logged and swallowed; clients still see the track on refresh.
+    """
+    graphql_url = os.environ.get('GRAPHQL_URL')
+    if not graphql_url:
+        print("Warning: GRAPHQL_URL not set, skipping subscription publish")
+        return
+
+    music = {field: item[field] for field in MUSIC_INPUT_FIELDS if item.get(field) is not None}
+    body = json.dumps({
+        'query': PUBLISH_MUSIC_CREATED,
+        'variables': {'music': music}
+    }, default=json_default)
+
+    try:
+        request = AWSRequest(
+            method='POST',
+            url=graphql_url,
+            data=body,
+            headers={'Content-Type': 'application/json'}
+        )
+        SigV4Auth(session.get_credentials(), 'appsync', session.region_name).add_auth(request)
+
+        http_request = urllib.request.Request(
+            graphql_url,
+            data=body.encode('utf-8'),
+            headers=dict(request.headers.items()),
+            method='POST'
+        )
+        with urllib.request.urlopen(http_request, timeout=PUBLISH_TIMEOUT_SECONDS) as response:
+            result = json.loads(response.read())
+
+        if result.get('errors'):
+            print(f"Warning: publishMusicCreated returned errors: {result['errors']}")
+    except Exception as e:
+        print(f"Warning: Could not publish music {item.get('music_id')}: {e}")
@@ -0,0 +1,135 @@
+import boto3
+import os
+import json
+import uuid
+import time
+import datetime
+from botocore.exceptions import ClientError
+from upload_buckets import upload_bucket
+from upload_handler import build_music_item, presign_upload
+from music_items import encode_item
+
+dynamodb = boto3.resource('dynamodb')
+
+# TransactWriteItems takes at most 100 actions, one of which is the token record
+MAX_BATCH_TRACKS = 99
+CLIENT_TOKEN_TTL_SECONDS = 24 * 60 * 60
+
+def music_ids_for(user_id, client_token, count):
+    """
+    Retries with the same client_token map to the same music_ids, so even a
+    replay that races the first request can only overwrite its own rows.
+    """
+    if not client_token:
+        return [str(uuid.uuid4()) for _ in range(count)]
+    namespace = uuid.uuid5(uuid.NAMESPACE_URL, f"audiobyte:{user_id}:{client_token}")
+    return [str(uuid.uuid5(namespace, str(index))) for index in range(count)]
+
+def build_response(bucket_name, uploads, replayed):
+    """Presign every upload URL in one pass; URLs are always fresh, even on replay."""
+    return {
+        'uploads': [
+            {
+                'music_id': upload['music_id'],
+                'upload_url': presign_upload(bucket_name, upload['s3_key']),
+                'message': f'Upload URL generated for "{upload["title"]}". Use this URL to upload your file.'
+            }
+            for upload in uploads
+        ],
+        'replayed': replayed,
+        'message': f'Upload URLs generated for {len(uploads)} track(s).'
+    }
+
+def handler(event, context):
+    """
+    AppSync Lambda handler for createMusicBatch mutation
+    Creates DynamoDB entries for a whole album and presigns all S3 upload URLs
+    Repeating a client_token replays the original batch instead of creating duplicates
+    """
+    BUCKET_NAME = os.environ['BUCKET_NAME']
+    TABLE_NAME = os.environ['TABLE_NAME']
+    IDEMPOTENCY_TABLE_NAME = os.environ['IDEMPOTENCY_TABLE_NAME']
+    table = dynamodb.Table(TABLE_NAME)
+    idempotency_table = dynamodb.Table(IDEMPOTENCY_TABLE_NAME)
+
+    identity = event.get('identity', {})
+
+    claims = identity.get('claims', {})
+    user_id = claims.get('sub') or identity.get('sub')
+    username = claims.get('cognito:username') or identity.get('username')
+
+    print(f"Event received: {json.dumps(event)}")
+    print(f"User ID: {user_id}, Username: {username}")
+
+    if not user_id:
+        raise Exception("User not authenticated - no user_id found in request")
+
+    try:
+        arguments = event.get('arguments', {})
+        tracks = arguments.get('tracks') or []
+        client_token = arguments.get('client_token')
+
+        if not tracks:
+            raise ValueError("At least one track is required")
+        if len(tracks) > MAX_BATCH_TRACKS:
+            raise ValueError(f"At most {MAX_BATCH_TRACKS} tracks can be uploaded at once")
+        if any(not track.get('title') for track in tracks):
+            raise ValueError("Title is required for every track")
+    except Exception as e:
+        raise Exception(f"Invalid input: {str(e)}")
+
+    token_id = f"{user_id}#{client_token}" if client_token else None
+
+    if token_id:
+        previous = idempotency_table.get_item(Key={'token_id': token_id}, ConsistentRead=True)
+        if 'Item' in previous:
+            print(f"Replaying createMusicBatch for client_token {client_token}")
+            return build_response(BUCKET_NAME, previous['Item']['uploads'], True)
+
+    timestamp = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    items = [
+        build_music_item(BUCKET_NAME, user_id, username, music_id, track, timestamp)
+        for music_id, track in zip(music_ids_for(user_id, client_token, len(tracks)), tracks)
+    ]
+    uploads = [
+        {'music_id': item['music_id'], 's3_key': item['s3_key'], 'title': item['title']}
+        for item in items
+    ]
+
+    if token_id:
+        # Rows and token record commit together, so a concurrent retry either
+        # sees the finished batch or loses the token condition and replays it
+        transact_items = [
+            {'Put': {
+                'TableName': TABLE_NAME,
+                'Item': encode_item({**item, 'upload_bucket': upload_bucket(timestamp, item['music_id'])})
+            }}
+            for item in items
+        ]
+        transact_items.append({'Put': {
+            'TableName': IDEMPOTENCY_TABLE_NAME,
+            'Item': {
+                'token_id': token_id,
+                'uploads': uploads,
+                'created_at': timestamp,
+                'expires_at': int(time.time()) + CLIENT_TOKEN_TTL_SECONDS
+            },
+            'ConditionExpression': 'attribute_not_exists(token_id)'
+        }})
+
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            previous = idempotency_table.get_item(Key={'token_id': token_id}, ConsistentRead=True)
+            if 'Item' not in previous:
+                raise Exception(f"Failed to create music batch: {str(e)}")
+            print(f"Concurrent createMusicBatch won for client_token {client_token}, replaying")
+            return build_response(BUCKET_NAME, previous['Item']['uploads'], True)
+    else:
+        with table.batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=encode_item({**item, 'upload_bucket': upload_bucket(timestamp, item['music_id'])}))
+
+    return build_response(BUCKET_NAME, uploads, False)
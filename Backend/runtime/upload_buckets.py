@@ -0,0 +1,30 @@
+import os
+import zlib
+
+# Tracks are spread over UPLOAD_SHARDS partitions per upload month so a burst of
+# uploads does not land on a single hot UploadedAtIndex partition, while a
+# sparse catalog still only has a few partitions to walk per page.
+UPLOAD_SHARDS = int(os.environ.get('UPLOAD_SHARDS', '4'))
+UPLOADED_AT_INDEX = 'UploadedAtIndex'
+
+def bucket_month(uploaded_at):
+    """Return the YYYY-MM month of an uploaded_at timestamp."""
+    return uploaded_at[:7]
+
+def upload_shard(music_id):
+    # Derived from music_id so it is stable for backfills
+    return zlib.crc32(music_id.encode('utf-8')) % UPLOAD_SHARDS
+
+def upload_bucket(uploaded_at, music_id):
+    """Partition key for UploadedAtIndex, e.g. "2024-05#3"."""
+    return f"{bucket_month(uploaded_at)}#{upload_shard(music_id)}"
+
+def month_buckets(month):
+    """All UploadedAtIndex partition keys for a given YYYY-MM month."""
+    return [f"{month}#{shard}" for shard in range(UPLOAD_SHARDS)]
+
+def previous_month(month):
+    year, number = int(month[:4]), int(month[5:7])
+    if number == 1:
+        return f"{year - 1:04d}-12"
+    return f"{year:04d}-{number - 1:02d}"
@@ -4,10 +4,39 @@ import json
 import uuid
 import datetime
 from botocore.config import Config
+from upload_buckets import upload_bucket
+from music_items import encode_item, canonical_s3_key, file_url_for
 
 s3 = boto3.client('s3', config=Config(signature_version='s3v4'))
 dynamodb = boto3.resource('dynamodb')
 
+def build_music_item(bucket_name, user_id, username, music_id, track, timestamp):
+    """Long-form track for a file that will be uploaded to music/<user_id>/<music_id>.mp3 (stored via encode_item)"""
+    key = canonical_s3_key(user_id, music_id)
+    return {
+        'music_id': music_id,
+        'title': track['title'],
+        'artist': track.get('artist') or 'Unknown Artist',
+        'album': track.get('album') or '',
+        'duration': track.get('duration') or 0,
+        'file_url': file_url_for(bucket_name, key),
+        's3_key': key,
+        'uploaded_at': timestamp,
+        'user_id': user_id,
+        'username': username or user_id
+    }
+
+def presign_upload(bucket_name, key):
+    return s3.generate_presigned_url(
+        'put_object',
+        Params={
+            'Bucket': bucket_name,
+            'Key': key,
+            'ContentType': 'audio/mpeg'
+        },
+        ExpiresIn=600
+    )
+
 def handler(event, context):
     """
     AppSync Lambda handler for createMusic mutation
@@ -43,36 +72,20 @@ def handler(event, context):
         raise Exception(f"Invalid input: {str(e)}")
 
     music_id = str(uuid.uuid4())
-    key = f"music/{user_id}/{music_id}.mp3"
-
-    presigned_url = s3.generate_presigned_url(
-        'put_object',
-        Params={
-            'Bucket': BUCKET_NAME,
-            'Key': key,
-            'ContentType': 'audio/mpeg'
-        },
-        ExpiresIn=600
-    )
-
     timestamp = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-    file_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{key}"
-    
-    table.put_item(Item={
-        'music_id': music_id,
+    item = build_music_item(BUCKET_NAME, user_id, username, music_id, {
         'title': title,
         'artist': artist,
         'album': album,
-        'duration': duration,
-        'file_url': file_url,
-        's3_key': key,
-        'uploaded_at': timestamp,
-        'user_id': user_id,
-        'username': username or user_id
-    })
+        'duration': duration
+    }, timestamp)
+
+    presigned_url = presign_upload(BUCKET_NAME, item['s3_key'])
+
+    table.put_item(Item=encode_item({**item, 'upload_bucket': upload_bucket(timestamp, music_id)}))
 
     return {
         'music_id': music_id,
         'upload_url': presigned_url,
         'message': f'Upload URL generated for "{title}". Use this URL to upload your file.'
-    }
\ No newline at end of file
+    }
@@ -55,9 +55,17 @@ function Player() {
       <div className="max-w-7xl mx-auto">
         <div className="flex items-center justify-between gap-4">
           <div className="flex items-center gap-3 w-1/4">
-            <div className="w-14 h-14 bg-gradient-to-br from-orange-500 to-pink-500 rounded flex items-center justify-center">
-              <Music size={24} />
-            </div>
+            {currentTrack.cover_url ? (
+              <img
+                src={currentTrack.cover_url}
+                alt=""
+                className="w-14 h-14 rounded object-cover"
+              />
+            ) : (
+              <div className="w-14 h-14 bg-gradient-to-br from-orange-500 to-pink-500 rounded flex items-center justify-center">
+                <Music size={24} />
+              </div>
+            )}
             <div className="min-w-0 flex-1">
               <div className="font-semibold truncate">{currentTrack.title}</div>
               <div className="text-sm text-gray-400 truncate">{currentTrack.artist || 'Unknown Artist'}</div>
@@ -32,6 +32,14 @@ const amplifyConfig = {
       },
     },
   },
+  // Used for real-time subscriptions; queries and mutations go through graphqlRequest
+  API: {
+    GraphQL: {
+      endpoint: import.meta.env.VITE_GRAPHQL_ENDPOINT,
+      region: import.meta.env.VITE_AWS_REGION || 'us-east-1',
+      defaultAuthMode: 'userPool',
+    },
+  },
 };
 
 Amplify.configure(amplifyConfig);
@@ -1,4 +1,8 @@
 import { createContext, useContext, useState, useRef, useEffect } from 'react';
+import { graphqlRequest, getStreamUrlsQuery } from '../utils/graphql';
+
+// Don't start a track on a URL that would expire within this window
+const STREAM_URL_MIN_REMAINING_MS = 5 * 60 * 1000;
 
 const MusicPlayerContext = createContext();
 
@@ -18,6 +22,30 @@ export const MusicPlayerProvider = ({ children }) => {
   const [duration, setDuration] = useState(0);
   const [playlist, setPlaylist] = useState([]);
   const audioRef = useRef(new Audio());
+  // music_id -> { url, expiresAt } for recently issued stream URLs
+  const streamUrlsRef = useRef(new Map());
+  const isPlayingRef = useRef(false);
+  const loadingTrackRef = useRef(false);
+
+  const cachedStreamUrl = (musicId) => {
+    const entry = streamUrlsRef.current.get(musicId);
+    if (!entry || entry.expiresAt - Date.now() < STREAM_URL_MIN_REMAINING_MS) return null;
+    return entry.url;
+  };
+
+  // Resolves stream URLs for the given tracks, only asking the API for uncached ones
+  const resolveStreamUrls = async (tracks) => {
+    const missing = tracks
+      .filter(track => track && !cachedStreamUrl(track.music_id))
+      .map(track => track.music_id);
+
+    if (missing.length > 0) {
+      const data = await graphqlRequest(getStreamUrlsQuery, { music_ids: missing });
+      (data.getStreamUrls || []).forEach(({ music_id, stream_url, expires_at }) => {
+        streamUrlsRef.current.set(music_id, { url: stream_url, expiresAt: new Date(expires_at).getTime() });
+      });
+    }
+  };
 
   useEffect(() => {
     const audio = audioRef.current;
@@ -50,20 +78,43 @@ export const MusicPlayerProvider = ({ children }) => {
   }, [volume]);
 
   useEffect(() => {
-    if (currentTrack) {
-      // Use stream_url (presigned) if available, fallback to file_url
-      const audioUrl = currentTrack.stream_url || currentTrack.file_url;
+    if (!currentTrack) return;
+    let cancelled = false;
+    loadingTrackRef.current = true;
+
+    const loadTrack = async () => {
+      // Fetch the current track's URL together with the next queued one
+      const currentIndex = playlist.findIndex(t => t.music_id === currentTrack.music_id);
+      const nextTrack = playlist.length > 1 ? playlist[(currentIndex + 1) % playlist.length] : null;
+      try {
+        await resolveStreamUrls([currentTrack, nextTrack]);
+      } catch (err) {
+        console.error('Error fetching stream URL:', err);
+      }
+      if (cancelled) return;
+
+      // Use the presigned stream URL if available, fallback to file_url
+      const audioUrl = cachedStreamUrl(currentTrack.music_id) || currentTrack.file_url;
       audioRef.current.src = audioUrl;
-      if (isPlaying) {
+      loadingTrackRef.current = false;
+      if (isPlayingRef.current) {
         audioRef.current.play().catch(err => {
           console.error('Playback error:', err);
           setIsPlaying(false);
         });
       }
-    }
+    };
+
+    loadTrack();
+    return () => {
+      cancelled = true;
+    };
   }, [currentTrack]);
 
   useEffect(() => {
+    isPlayingRef.current = isPlaying;
+    // A track whose stream URL is still resolving starts playing once it loads
+    if (loadingTrackRef.current) return;
     if (isPlaying && currentTrack) {
       audioRef.current.play().catch(err => {
         console.error('Playback error:', err);
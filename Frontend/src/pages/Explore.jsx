@@ -1,24 +1,65 @@
 import { useState, useEffect } from 'react';
 import { Music, Globe, Play, Loader, User } from 'lucide-react';
-import { graphqlRequest, listAllMusicQuery } from '../utils/graphql';
+import {
+  graphqlRequest,
+  graphqlSubscribe,
+  applyMusicChange,
+  listAllMusicQuery,
+  onMusicCreatedSubscription,
+  onMusicDeletedSubscription,
+} from '../utils/graphql';
 import { useMusicPlayer } from '../context/MusicPlayerContext';
 
+const PAGE_SIZE = 50;
+
 function Explore() {
   const [songs, setSongs] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextToken, setNextToken] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { playTrack, currentTrack } = useMusicPlayer();
 
   useEffect(() => {
     fetchAllSongs();
   }, []);
 
+  // After the initial load, apply uploads/deletes as deltas instead of refetching
+  useEffect(() => {
+    const unsubscribeCreated = graphqlSubscribe(onMusicCreatedSubscription, {}, (data) => {
+      setSongs(prev => applyMusicChange(prev, data.onMusicCreated));
+    });
+    const unsubscribeDeleted = graphqlSubscribe(onMusicDeletedSubscription, {}, (data) => {
+      setSongs(prev => applyMusicChange(prev, data.onMusicDeleted));
+    });
+
+    return () => {
+      unsubscribeCreated();
+      unsubscribeDeleted();
+    };
+  }, []);
+
+  // A NEWEST page stops early after walking several empty months; keep
+  // following the cursor while pages come back empty so sparse catalogs fill in
+  const fetchNewestPage = async (token) => {
+    let items = [];
+    let next = token;
+    do {
+      const variables = { order: 'NEWEST', limit: PAGE_SIZE, ...(next ? { nextToken: next } : {}) };
+      const data = await graphqlRequest(listAllMusicQuery, variables);
+      items = data.listAllMusic?.items || [];
+      next = data.listAllMusic?.nextToken || null;
+    } while (items.length === 0 && next);
+    return { items, nextToken: next };
+  };
+
   const fetchAllSongs = async () => {
     try {
       setLoading(true);
       setError(null);
-      const data = await graphqlRequest(listAllMusicQuery);
-      setSongs(data.listAllMusic || []);
+      const page = await fetchNewestPage(null);
+      setSongs(page.items);
+      setNextToken(page.nextToken);
     } catch (err) {
       console.error('Error fetching songs:', err);
       setError(err.message);
@@ -27,6 +68,24 @@ function Explore() {
     }
   };
 
+  const fetchMoreSongs = async () => {
+    if (!nextToken) return;
+    try {
+      setLoadingMore(true);
+      const page = await fetchNewestPage(nextToken);
+      setSongs(prev => [
+        ...prev,
+        ...page.items.filter(song => !prev.some(existing => existing.music_id === song.music_id)),
+      ]);
+      setNextToken(page.nextToken);
+    } catch (err) {
+      console.error('Error fetching more songs:', err);
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatDuration = (seconds) => {
     if (!seconds) return '0:00';
     const mins = Math.floor(seconds / 60);
@@ -65,7 +124,7 @@ function Explore() {
         <div className="flex items-center justify-between">
           <div>
             <h3 className="text-2xl font-bold">{songs.length}</h3>
-            <p className="text-gray-300">Total Community Tracks</p>
+            <p className="text-gray-300">{nextToken ? 'Latest Community Tracks' : 'Total Community Tracks'}</p>
           </div>
           <Globe size={48} className="text-orange-500 opacity-50" />
         </div>
@@ -143,7 +202,18 @@ function Explore() {
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div className="flex items-center">
-                        <Music size={16} className="mr-2 text-orange-500" />
+                        {song.cover_url ? (
+                          <img
+                            src={song.cover_url}
+                            alt=""
+                            width={40}
+                            height={40}
+                            loading="lazy"
+                            className="w-10 h-10 mr-3 rounded object-cover"
+                          />
+                        ) : (
+                          <Music size={16} className="mr-2 text-orange-500" />
+                        )}
                         <span className="font-medium">{song.title}</span>
                       </div>
                     </td>
@@ -183,6 +253,17 @@ function Explore() {
               </tbody>
             </table>
           </div>
+          {nextToken && (
+            <div className="p-4 text-center border-t border-gray-700">
+              <button
+                onClick={fetchMoreSongs}
+                className="px-4 py-2 bg-gray-700 hover:bg-gray-600 rounded-lg transition"
+                disabled={loadingMore}
+              >
+                {loadingMore ? 'Loading...' : 'Load More'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
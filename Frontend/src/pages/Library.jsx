@@ -1,7 +1,15 @@
 import { useState, useEffect } from 'react';
 import { Music, Heart, Clock, Play, Trash2, Loader } from 'lucide-react';
-import { graphqlRequest, listMusicQuery, deleteMusicMutation } from '../utils/graphql';
+import {
+  graphqlRequest,
+  graphqlSubscribe,
+  applyMusicChange,
+  listMusicQuery,
+  deleteMusicMutation,
+  onMyMusicChangedSubscription,
+} from '../utils/graphql';
 import { useMusicPlayer } from '../context/MusicPlayerContext';
+import { useAuth } from '../context/AuthContext';
 
 function Library() {
   const [songs, setSongs] = useState([]);
@@ -9,11 +17,23 @@ function Library() {
   const [error, setError] = useState(null);
   const [deleting, setDeleting] = useState(null);
   const { playTrack, currentTrack } = useMusicPlayer();
+  const { user } = useAuth();
 
   useEffect(() => {
     fetchSongs();
   }, []);
 
+  // Keep the library in sync with uploads/deletes from any device without refetching
+  useEffect(() => {
+    if (!user?.userId) return;
+
+    return graphqlSubscribe(
+      onMyMusicChangedSubscription,
+      { user_id: user.userId },
+      (data) => setSongs(prev => applyMusicChange(prev, data.onMyMusicChanged))
+    );
+  }, [user?.userId]);
+
   const fetchSongs = async () => {
     try {
       setLoading(true);
@@ -36,7 +56,7 @@ function Library() {
     try {
       setDeleting(musicId);
       await graphqlRequest(deleteMusicMutation, { music_id: musicId });
-      setSongs(songs.filter(song => song.music_id !== musicId));
+      setSongs(prev => prev.filter(song => song.music_id !== musicId));
     } catch (err) {
       console.error('Error deleting song:', err);
       alert(`Failed to delete: ${err.message}`);
@@ -158,7 +178,18 @@ function Library() {
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div className="flex items-center">
-                        <Music size={16} className="mr-2 text-orange-500" />
+                        {song.cover_url ? (
+                          <img
+                            src={song.cover_url}
+                            alt=""
+                            width={40}
+                            height={40}
+                            loading="lazy"
+                            className="w-10 h-10 mr-3 rounded object-cover"
+                          />
+                        ) : (
+                          <Music size={16} className="mr-2 text-orange-500" />
+                        )}
                         <span className="font-medium">{song.title}</span>
                       </div>
                     </td>
@@ -1,13 +1,16 @@
 import { useState, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Upload as UploadIcon, Image, Music, CheckCircle, AlertCircle } from 'lucide-react';
-import { graphqlRequest, createMusicMutation } from '../utils/graphql';
+import { graphqlRequest, createMusicMutation, createMusicBatchMutation } from '../utils/graphql';
 import { useAuth } from '../context/AuthContext';
 
+// createMusicBatch limit
+const MAX_BATCH_TRACKS = 99;
+
 function Upload() {
   const navigate = useNavigate();
   const { user, isAuthenticated } = useAuth();
-  const [audioFile, setAudioFile] = useState(null);
+  const [audioFiles, setAudioFiles] = useState([]);
   const [title, setTitle] = useState('');
   const [artist, setArtist] = useState('');
   const [album, setAlbum] = useState('');
@@ -16,49 +19,89 @@ function Upload() {
   const [uploadProgress, setUploadProgress] = useState(0);
   const [message, setMessage] = useState({ type: '', text: '' });
   const fileInputRef = useRef(null);
+  // Kept across retries of the same album so createMusicBatch replays instead of duplicating
+  const clientTokenRef = useRef(null);
 
-  const handleFileChange = (e) => {
-    const file = e.target.files[0];
-    if (file && file.type.startsWith('audio/')) {
-      setAudioFile(file);
-      setMessage({ type: '', text: '' });
-      
-      if (!title) {
-        const filename = file.name.replace(/\.[^/.]+$/, '');
-        setTitle(filename);
-      }
-    } else {
-      setMessage({ type: 'error', text: 'Please select a valid audio file' });
+  const trackTitle = (file) => file.name.replace(/\.[^/.]+$/, '');
+
+  const selectFiles = (fileList, invalidText) => {
+    const files = Array.from(fileList || []).filter(file => file.type.startsWith('audio/'));
+    if (files.length === 0) {
+      setMessage({ type: 'error', text: invalidText });
+      return;
+    }
+    setAudioFiles(files);
+    clientTokenRef.current = null;
+    setMessage({ type: '', text: '' });
+
+    if (files.length === 1 && !title) {
+      setTitle(trackTitle(files[0]));
     }
   };
 
+  const handleFileChange = (e) => {
+    selectFiles(e.target.files, 'Please select a valid audio file');
+  };
+
   const handleDragOver = (e) => {
     e.preventDefault();
   };
 
   const handleDrop = (e) => {
     e.preventDefault();
-    const file = e.dataTransfer.files[0];
-    if (file && file.type.startsWith('audio/')) {
-      setAudioFile(file);
-      setMessage({ type: '', text: '' });
-      
-      if (!title) {
-        const filename = file.name.replace(/\.[^/.]+$/, '');
-        setTitle(filename);
-      }
-    } else {
-      setMessage({ type: 'error', text: 'Please drop a valid audio file' });
+    selectFiles(e.dataTransfer.files, 'Please drop a valid audio file');
+  };
+
+  const readDuration = (file) => new Promise((resolve) => {
+    const audio = new Audio();
+    audio.addEventListener('loadedmetadata', () => {
+      resolve(Math.floor(audio.duration));
+    });
+    audio.src = URL.createObjectURL(file);
+  });
+
+  // One createMusic per single track, one createMusicBatch for a whole album
+  const requestUploadUrls = async (durations) => {
+    const shared = {
+      artist: artist.trim() || 'Unknown Artist',
+      album: album.trim() || genre,
+    };
+
+    if (audioFiles.length === 1) {
+      const data = await graphqlRequest(createMusicMutation, {
+        ...shared,
+        title: title.trim(),
+        duration: durations[0],
+      });
+      return [data.createMusic];
     }
+
+    if (!clientTokenRef.current) {
+      clientTokenRef.current = crypto.randomUUID();
+    }
+    const data = await graphqlRequest(createMusicBatchMutation, {
+      tracks: audioFiles.map((file, index) => ({
+        ...shared,
+        title: trackTitle(file),
+        duration: durations[index],
+      })),
+      client_token: clientTokenRef.current,
+    });
+    return data.createMusicBatch.uploads;
   };
 
   const handleUpload = async () => {
-    if (!audioFile) {
+    if (audioFiles.length === 0) {
       setMessage({ type: 'error', text: 'Please select an audio file' });
       return;
     }
 
-    if (!title.trim()) {
+    if (audioFiles.length > MAX_BATCH_TRACKS) {
+      setMessage({ type: 'error', text: `Please select at most ${MAX_BATCH_TRACKS} tracks at once` });
+      return;
+    }
+
+    if (audioFiles.length === 1 && !title.trim()) {
       setMessage({ type: 'error', text: 'Please enter a track title' });
       return;
     }
@@ -69,41 +112,36 @@ function Upload() {
 
     try {
 
-      const audio = new Audio();
-      const duration = await new Promise((resolve) => {
-        audio.addEventListener('loadedmetadata', () => {
-          resolve(Math.floor(audio.duration));
-        });
-        audio.src = URL.createObjectURL(audioFile);
-      });
+      const durations = await Promise.all(audioFiles.map(readDuration));
 
       setUploadProgress(10);
-      const data = await graphqlRequest(createMusicMutation, {
-        title: title.trim(),
-        artist: artist.trim() || 'Unknown Artist',
-        album: album.trim() || genre,
-        duration: duration,
-      });
-
-      const { upload_url, music_id, message: successMessage } = data.createMusic;
+      const uploads = await requestUploadUrls(durations);
       setUploadProgress(30);
 
-      const uploadResponse = await fetch(upload_url, {
-        method: 'PUT',
-        headers: {
-          'Content-Type': 'audio/mpeg',
-        },
-        body: audioFile,
-      });
+      let completed = 0;
+      await Promise.all(uploads.map(async ({ upload_url }, index) => {
+        const uploadResponse = await fetch(upload_url, {
+          method: 'PUT',
+          headers: {
+            'Content-Type': 'audio/mpeg',
+          },
+          body: audioFiles[index],
+        });
 
-      if (!uploadResponse.ok) {
-        throw new Error('Failed to upload file to S3');
-      }
+        if (!uploadResponse.ok) {
+          throw new Error(`Failed to upload ${audioFiles[index].name} to S3`);
+        }
+        completed += 1;
+        setUploadProgress(30 + Math.round((70 * completed) / uploads.length));
+      }));
 
+      clientTokenRef.current = null;
       setUploadProgress(100);
       setMessage({ 
         type: 'success', 
-        text: `Track "${title}" uploaded successfully! Redirecting to library...` 
+        text: audioFiles.length === 1
+          ? `Track "${title}" uploaded successfully! Redirecting to library...`
+          : `${audioFiles.length} tracks uploaded successfully! Redirecting to library...`
       });
 
       setTimeout(() => {
@@ -154,13 +192,16 @@ function Upload() {
         >
           <UploadIcon size={48} className="mx-auto mb-4 text-gray-400" />
           <p className="text-lg mb-2">
-            {audioFile ? audioFile.name : 'Drag and drop your audio file here'}
+            {audioFiles.length === 0
+              ? 'Drag and drop your audio files here'
+              : audioFiles.length === 1 ? audioFiles[0].name : `${audioFiles.length} tracks selected`}
           </p>
           <p className="text-sm text-gray-400">or click to browse</p>
           <input
             ref={fileInputRef}
             type="file"
             accept="audio/*"
+            multiple
             onChange={handleFileChange}
             className="hidden"
           />
@@ -193,6 +234,16 @@ function Upload() {
         )}
 
         <div className="space-y-4">
+          {audioFiles.length > 1 ? (
+          <div>
+            <label className="block text-sm font-medium mb-2">Tracks</label>
+            <ul className="px-4 py-2 bg-gray-700 rounded-lg text-sm text-gray-300 space-y-1 max-h-48 overflow-y-auto">
+              {audioFiles.map(file => (
+                <li key={file.name}>{trackTitle(file)}</li>
+              ))}
+            </ul>
+          </div>
+          ) : (
           <div>
             <label className="block text-sm font-medium mb-2">Track Title *</label>
             <input 
@@ -204,6 +255,7 @@ function Upload() {
               disabled={uploading}
             />
           </div>
+          )}
 
           <div>
             <label className="block text-sm font-medium mb-2">Artist</label>
@@ -248,10 +300,10 @@ function Upload() {
 
           <button 
             onClick={handleUpload}
-            disabled={uploading || !audioFile}
+            disabled={uploading || audioFiles.length === 0}
             className="w-full py-3 bg-orange-500 hover:bg-orange-600 rounded-lg font-semibold transition disabled:opacity-50 disabled:cursor-not-allowed"
           >
-            {uploading ? 'Uploading...' : 'Upload Track'}
+            {uploading ? 'Uploading...' : audioFiles.length > 1 ? 'Upload Tracks' : 'Upload Track'}
           </button>
         </div>
       </div>
@@ -1,4 +1,5 @@
 import { fetchAuthSession } from 'aws-amplify/auth';
+import { generateClient } from 'aws-amplify/api';
 
 const GRAPHQL_ENDPOINT = import.meta.env.VITE_GRAPHQL_ENDPOINT
 const API_KEY = import.meta.env.VITE_GRAPHQL_API_KEY
@@ -48,6 +49,34 @@ export const graphqlRequest = async (query, variables = {}, useAuth = true) => {
   return result.data;
 };
 
+let subscriptionClient = null;
+
+// Opens an AppSync real-time subscription and returns a function that closes it.
+export const graphqlSubscribe = (query, variables = {}, onData, onError) => {
+  if (!subscriptionClient) {
+    subscriptionClient = generateClient();
+  }
+
+  const subscription = subscriptionClient
+    .graphql({ query, variables })
+    .subscribe({
+      next: ({ data }) => onData(data),
+      error: (error) => {
+        console.error('GraphQL Subscription Error:', error);
+        if (onError) onError(error);
+      },
+    });
+
+  return () => subscription.unsubscribe();
+};
+
+// Merges a subscription delta into a track list without refetching it.
+export const applyMusicChange = (songs, music) => {
+  if (!music) return songs;
+  const rest = songs.filter(song => song.music_id !== music.music_id);
+  return music.change === 'DELETED' ? rest : [music, ...rest];
+};
+
 export const createMusicMutation = `
   mutation CreateMusic(
     $title: String!
@@ -68,6 +97,21 @@ export const createMusicMutation = `
   }
 `;
 
+// Reuse the same client_token when retrying so the batch is replayed, not duplicated
+export const createMusicBatchMutation = `
+  mutation CreateMusicBatch($tracks: [TrackInput!]!, $client_token: String) {
+    createMusicBatch(tracks: $tracks, client_token: $client_token) {
+      uploads {
+        music_id
+        upload_url
+        message
+      }
+      replayed
+      message
+    }
+  }
+`;
+
 export const listMusicQuery = `
   query ListMusic {
     listMusic {
@@ -77,34 +121,75 @@ export const listMusicQuery = `
       album
       duration
       file_url
-      stream_url
       uploaded_at
       user_id
       username
+      cover_url
     }
   }
 `;
 
 export const listAllMusicQuery = `
-  query ListAllMusic {
-    listAllMusic {
+  query ListAllMusic(
+    $order: MusicOrder
+    $since: AWSDateTime
+    $limit: Int
+    $nextToken: String
+  ) {
+    listAllMusic(
+      order: $order
+      since: $since
+      limit: $limit
+      nextToken: $nextToken
+    ) {
+      items {
+        music_id
+        title
+        artist
+        album
+        duration
+        file_url
+        uploaded_at
+        user_id
+        username
+        cover_url
+      }
+      nextToken
+    }
+  }
+`;
+
+// Presigned stream URLs are issued only for tracks being played or queued
+export const getStreamUrlsQuery = `
+  query GetStreamUrls($music_ids: [ID!]!) {
+    getStreamUrls(music_ids: $music_ids) {
+      music_id
+      stream_url
+      expires_at
+    }
+  }
+`;
+
+export const getMusicQuery = `
+  query GetMusic($music_id: ID!) {
+    getMusic(music_id: $music_id) {
       music_id
       title
       artist
       album
       duration
       file_url
-      stream_url
       uploaded_at
       user_id
       username
+      cover_url
     }
   }
 `;
 
-export const getMusicQuery = `
-  query GetMusic($music_id: ID!) {
-    getMusic(music_id: $music_id) {
+export const deleteMusicMutation = `
+  mutation DeleteMusic($music_id: ID!) {
+    deleteMusic(music_id: $music_id) {
       music_id
       title
       artist
@@ -114,15 +199,61 @@ export const getMusicQuery = `
       uploaded_at
       user_id
       username
+      change
     }
   }
 `;
 
-export const deleteMusicMutation = `
-  mutation DeleteMusic($music_id: ID!) {
-    deleteMusic(music_id: $music_id) {
+export const onMusicCreatedSubscription = `
+  subscription OnMusicCreated {
+    onMusicCreated {
       music_id
       title
+      artist
+      album
+      duration
+      file_url
+      uploaded_at
+      user_id
+      username
+      cover_url
+      change
+    }
+  }
+`;
+
+export const onMusicDeletedSubscription = `
+  subscription OnMusicDeleted {
+    onMusicDeleted {
+      music_id
+      title
+      artist
+      album
+      duration
+      file_url
+      uploaded_at
+      user_id
+      username
+      cover_url
+      change
+    }
+  }
+`;
+
+export const onMyMusicChangedSubscription = `
+  subscription OnMyMusicChanged($user_id: String!) {
+    onMyMusicChanged(user_id: $user_id) {
+      music_id
+      title
+      artist
+      album
+      duration
+      file_url
+      uploaded_at
+      user_id
+      username
+      cover_url
+      change
     }
   }
 `;
@@ -0,0 +1,58 @@
+#Backfill upload_bucket on tracks written before UploadedAtIndex existed
+
+
+import boto3
+
+from runtime_path import use_backend_runtime
+
+use_backend_runtime()
+from upload_buckets import upload_bucket, bucket_month
+
+DYNAMODB_TABLE = "audiobyte-metadata-6203"
+
+def backfill_upload_buckets():
+    dynamodb = boto3.resource('dynamodb')
+    table = dynamodb.Table(DYNAMODB_TABLE)
+
+    print(f"Scanning {DYNAMODB_TABLE} for tracks to re-bucket")
+
+    updated = 0
+    oldest = None
+    scan_kwargs = {'ProjectionExpression': 'music_id, uploaded_at, upload_bucket'}
+    while True:
+        response = table.scan(**scan_kwargs)
+
+        for item in response.get('Items', []):
+            if 'uploaded_at' not in item:
+                print(f" Skipping {item['music_id']} (no uploaded_at)")
+                continue
+
+            if oldest is None or item['uploaded_at'] < oldest:
+                oldest = item['uploaded_at']
+
+            bucket = upload_bucket(item['uploaded_at'], item['music_id'])
+            if item.get('upload_bucket') == bucket:
+                continue
+
+            try:
+                table.update_item(
+                    Key={'music_id': item['music_id']},
+                    UpdateExpression='SET upload_bucket = :b',
+                    ConditionExpression='attribute_exists(music_id)',
+                    ExpressionAttributeValues={':b': bucket}
+                )
+                updated += 1
+            except Exception as e:
+                print(f" Failed to update {item['music_id']}: {str(e)}")
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    print(f"Backfill complete! Tracks updated: {updated}")
+    if oldest:
+        # listAllMusic(order: NEWEST) stops paging at CATALOG_START_MONTH
+        print(f"Oldest track month: {bucket_month(oldest)} (CATALOG_START_MONTH must not be later)")
+
+if __name__ == "__main__":
+    backfill_upload_buckets()
@@ -0,0 +1,141 @@
+#Benchmark decoding listing pages: resource/TypeDeserializer path vs low-level Music records
+
+
+import argparse
+import decimal
+import json
+import sys
+import time
+import tracemalloc
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from runtime_path import use_backend_runtime
+
+use_backend_runtime()
+from music_items import canonical_s3_key, decode_item, music_from_attributes
+
+S3_BUCKET = "audiobyte-music-6203"
+
+def sample_rows(count, layout):
+    """Low-level (AttributeValue) rows as Scan/Query return them."""
+    rows = []
+    for i in range(count):
+        music_id = f"{i:08x}-1c2d-4e5f-8a9b-0c1d2e3f4a5b"
+        user_id = f"user-{i % 97:04d}"
+        uploaded_at = f"2026-10-{1 + i % 28:02d}T12:{i % 60:02d}:00.000000Z"
+        compact = layout == 'v2' or (layout == 'mixed' and i % 2)
+        if compact:
+            row = {
+                'music_id': {'S': music_id},
+                'v': {'N': '2'},
+                'uploaded_at': {'S': uploaded_at},
+                'upload_bucket': {'S': f"{uploaded_at[:7]}#{i % 4}"},
+                't': {'S': f"Track {i}"},
+                'ar': {'S': f"Artist {i % 311}"},
+                'al': {'S': f"Album {i % 53}"},
+                'd': {'N': str(120 + i % 240)},
+                'u': {'S': user_id},
+                'un': {'S': f"listener{i % 97}"},
+            }
+        else:
+            s3_key = canonical_s3_key(user_id, music_id)
+            row = {
+                'music_id': {'S': music_id},
+                'uploaded_at': {'S': uploaded_at},
+                'upload_bucket': {'S': f"{uploaded_at[:7]}#{i % 4}"},
+                'title': {'S': f"Track {i}"},
+                'artist': {'S': f"Artist {i % 311}"},
+                'album': {'S': f"Album {i % 53}"},
+                'duration': {'N': str(120 + i % 240)},
+                'user_id': {'S': user_id},
+                'username': {'S': f"listener{i % 97}"},
+                's3_key': {'S': s3_key},
+                'file_url': {'S': f"https://{S3_BUCKET}.s3.amazonaws.com/{s3_key}"},
+            }
+        if i % 3 == 0:
+            row['cv'] = {'S': f"{i:016x}"}
+        rows.append(row)
+    return rows
+
+def decimal_default(value):
+    # What the Lambda runtime does for Decimal when marshalling the response
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def resource_path(rows):
+    """What boto3.resource does per row, then decode_item and response marshalling."""
+    deserializer = TypeDeserializer()
+    items = [
+        decode_item({key: deserializer.deserialize(value) for key, value in row.items()}, S3_BUCKET)
+        for row in rows
+    ]
+    return items, json.dumps(items, default=decimal_default)
+
+def record_path(rows):
+    """Low-level client rows decoded into slotted Music records and serialized directly."""
+    items = [music_from_attributes(row).to_response(S3_BUCKET) for row in rows]
+    return items, json.dumps(items)
+
+PATHS = (('resource+TypeDeserializer', resource_path), ('client+Music', record_path))
+
+def measure(path, rows, rounds):
+    """(CPU seconds per 1,000 items, peak traced bytes per 1,000 items)."""
+    path(rows)  # warm-up
+    started = time.process_time()
+    for _ in range(rounds):
+        path(rows)
+    cpu = (time.process_time() - started) / rounds
+
+    # Rows themselves are already resident; only allocations made while
+    # decoding and serializing count towards the peak
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = path(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    scale = 1000 / len(rows)
+    return cpu * scale, peak * scale
+
+def benchmark(count, rounds, layout):
+    rows = sample_rows(count, layout)
+
+    # Both paths must produce the same response before their cost is compared
+    baseline = json.loads(resource_path(rows)[1])
+    candidate = json.loads(record_path(rows)[1])
+    for expected, actual in zip(baseline, candidate):
+        expected.pop('s3_key', None)
+        expected.setdefault('cover_url', None)
+    if baseline != candidate:
+        raise Exception("Decoded responses differ between paths")
+
+    print(f"{count} {layout} row(s), {rounds} round(s)")
+    print(f"{'path':<28}{'CPU ms / 1k':>14}{'peak KiB / 1k':>16}")
+    results = {}
+    for name, path in PATHS:
+        cpu, peak = measure(path, rows, rounds)
+        results[name] = (cpu, peak)
+        print(f"{name:<28}{cpu * 1000:>14.2f}{peak / 1024:>16.1f}")
+
+    (base_cpu, base_peak), (cpu, peak) = results[PATHS[0][0]], results[PATHS[1][0]]
+    print(f"client+Music uses {cpu / base_cpu:.0%} of the CPU time and {peak / base_peak:.0%} of the peak memory")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare listing decode paths per 1,000 items")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--layout", choices=["v1", "v2", "mixed"], default="mixed")
+    args = parser.parse_args()
+
+    try:
+        benchmark(args.items, args.rounds, args.layout)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
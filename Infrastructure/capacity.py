@@ -0,0 +1,34 @@
+#Throttle table scans and writes to a capacity budget shared by worker threads
+
+
+import threading
+import time
+
+
+class CapacityLimiter:
+    """
+    Token bucket shared by all workers. Callers report the capacity units a
+    request actually consumed and sleep once the budget is overdrawn.
+    """
+
+    def __init__(self, units_per_second):
+        self.rate = units_per_second
+        self.available = units_per_second or 0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, units):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.rate, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+            self.available -= units
+            wait = -self.available / self.rate if self.available < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def consumed_units(response):
+    return response.get('ConsumedCapacity', {}).get('CapacityUnits', 0)
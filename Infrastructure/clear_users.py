@@ -31,8 +31,9 @@ def delete_user_music(user_sub, username):
     print(f"  Scanning for music by user: {username} (ID: {user_sub})")
     
     try:
+        # user_id is stored as 'u' in compact rows
         response = table.scan(
-            FilterExpression='user_id = :uid',
+            FilterExpression='user_id = :uid OR u = :uid',
             ExpressionAttributeValues={':uid': user_sub}
         )
         
@@ -41,8 +42,8 @@ def delete_user_music(user_sub, username):
         
         for item in items:
             music_id = item['music_id']
-            title = item.get('title', 'Unknown')
-            s3_key = item.get('s3_key', f"music/{user_sub}/{music_id}.mp3")
+            title = item.get('title') or item.get('t', 'Unknown')
+            s3_key = item.get('s3_key') or item.get('k') or f"music/{user_sub}/{music_id}.mp3"
             
             print(f"  - Deleting: {title}")
             
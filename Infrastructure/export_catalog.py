@@ -0,0 +1,133 @@
+#Export a catalog snapshot of the music table to the analytics bucket
+
+
+import argparse
+import datetime
+import json
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from capacity import CapacityLimiter, consumed_units
+from runtime_path import use_backend_runtime
+
+use_backend_runtime()
+from catalog_export import CATALOG_PREFIX, CATALOG_COLUMNS, to_catalog_row, upload_month, resolve_format, encode_rows
+
+DYNAMODB_TABLE = "audiobyte-metadata-6203"
+S3_BUCKET = "audiobyte-music-6203"
+ANALYTICS_BUCKET = "audiobyte-analytics-6203"
+
+def export_segment(table_name, analytics_bucket, snapshot_prefix, segment, total_segments,
+                   read_limiter, rows_per_file, file_format):
+    """
+    Scan one segment, buffering rows per upload_month partition and writing a
+    compressed file whenever a partition buffer fills up.
+    """
+    session = boto3.session.Session()
+    table = session.resource('dynamodb').Table(table_name)
+    s3 = session.client('s3')
+
+    buffers = defaultdict(list)
+    files = []
+
+    def flush(month):
+        rows = buffers.pop(month)
+        body, extension = encode_rows(rows, file_format)
+        key = f"{snapshot_prefix}/upload_month={month}/segment={segment:04d}-part={len(files):05d}.{extension}"
+        s3.put_object(Bucket=analytics_bucket, Key=key, Body=body)
+        files.append({'key': key, 'rows': len(rows), 'bytes': len(body)})
+
+    scan_kwargs = {
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'ReturnConsumedCapacity': 'TOTAL'
+    }
+    while True:
+        response = table.scan(**scan_kwargs)
+        read_limiter.consume(consumed_units(response))
+
+        for item in response.get('Items', []):
+            row = to_catalog_row(item, S3_BUCKET)
+            month = upload_month(row)
+            buffers[month].append(row)
+            if len(buffers[month]) >= rows_per_file:
+                flush(month)
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    for month in list(buffers):
+        flush(month)
+    return files
+
+def export_catalog(table_name, analytics_bucket, total_segments=8, max_read_units=None,
+                   rows_per_file=100000, file_format='auto'):
+    file_format = resolve_format(file_format)
+    started_at = datetime.datetime.utcnow()
+    snapshot_id = started_at.strftime('%Y%m%dT%H%M%SZ')
+    snapshot_prefix = f"{CATALOG_PREFIX}/snapshots/snapshot={snapshot_id}"
+    read_limiter = CapacityLimiter(max_read_units)
+
+    print(f"Exporting {table_name} to s3://{analytics_bucket}/{snapshot_prefix} "
+          f"as {file_format} with {total_segments} segment(s)")
+
+    with ThreadPoolExecutor(max_workers=total_segments) as pool:
+        futures = [
+            pool.submit(export_segment, table_name, analytics_bucket, snapshot_prefix, segment,
+                        total_segments, read_limiter, rows_per_file, file_format)
+            for segment in range(total_segments)
+        ]
+        files = [file for future in futures for file in future.result()]
+
+    # Change files from the table stream with changed_at >= started_at must be
+    # replayed on top of this snapshot to bring it up to date
+    manifest = {
+        'snapshot_id': snapshot_id,
+        'table': table_name,
+        'started_at': started_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'finished_at': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'format': file_format,
+        'columns': [{'name': name, 'type': kind} for name, kind in CATALOG_COLUMNS],
+        'partitioned_by': ['upload_month'],
+        'changes_prefix': f"{CATALOG_PREFIX}/changes/",
+        'row_count': sum(file['rows'] for file in files),
+        'files': files
+    }
+    s3 = boto3.client('s3')
+    body = json.dumps(manifest, indent=2).encode('utf-8')
+    s3.put_object(Bucket=analytics_bucket, Key=f"{snapshot_prefix}/_manifest.json", Body=body)
+    # Only point readers at the snapshot once every file is in place
+    s3.put_object(Bucket=analytics_bucket, Key=f"{CATALOG_PREFIX}/latest.json", Body=body)
+
+    print(f"Export complete! Rows: {manifest['row_count']}, files: {len(files)}")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the music catalog to compressed columnar files")
+    parser.add_argument("--table", default=DYNAMODB_TABLE)
+    parser.add_argument("--bucket", default=ANALYTICS_BUCKET)
+    parser.add_argument("--segments", type=int, default=8, help="parallel scan TotalSegments")
+    parser.add_argument("--max-rcu", type=float, default=None, help="read capacity units per second")
+    parser.add_argument("--rows-per-file", type=int, default=100000)
+    parser.add_argument("--format", choices=["auto", "parquet", "ndjson"], default="auto")
+    args = parser.parse_args()
+
+    try:
+        export_catalog(
+            args.table,
+            args.bucket,
+            total_segments=args.segments,
+            max_read_units=args.max_rcu,
+            rows_per_file=args.rows_per_file,
+            file_format=args.format
+        )
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,15 @@ from aws_cdk import (
     RemovalPolicy,
     CfnOutput,
     Duration,
+    BundlingOptions,
     aws_s3 as s3,
+    aws_sqs as sqs,
+    aws_s3_notifications as s3n,
+    aws_cloudfront as cloudfront,
+    aws_cloudfront_origins as origins,
     aws_dynamodb as dynamodb,
     aws_lambda as _lambda,
+    aws_lambda_event_sources as lambda_event_sources,
     aws_appsync as appsync,
     aws_cognito as cognito,
     aws_iam as iam,
@@ -130,15 +136,65 @@ class InfrastructureStack(Stack):
             )]
         )
 
+        # Cover thumbnails live under per-version paths and never change, so serve covers/ through a CDN
+        covers_distribution = cloudfront.Distribution(self, "AudioByteCovers",
+            default_behavior=cloudfront.BehaviorOptions(
+                origin=origins.S3BucketOrigin.with_origin_access_control(music_bucket,
+                    origin_path="/covers"
+                ),
+                viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+                cache_policy=cloudfront.CachePolicy.CACHING_OPTIMIZED
+            )
+        )
+
         music_table = dynamodb.Table(self, "AudioByteMeta",
             table_name="audiobyte-metadata-6203",
             partition_key=dynamodb.Attribute(
                 name="music_id", 
                 type=dynamodb.AttributeType.STRING
             ),
+            # Feeds incremental catalog exports to the analytics bucket
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
             removal_policy=RemovalPolicy.DESTROY
         )
 
+        # Catalog snapshots and change files for analytics, so reports never scan the live table
+        analytics_bucket = s3.Bucket(self, "AudioByteAnalytics",
+            bucket_name="audiobyte-analytics-6203",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True
+        )
+
+        # Newest-first listing: partitioned by upload month + shard, sorted by upload time
+        music_table.add_global_secondary_index(
+            index_name="UploadedAtIndex",
+            partition_key=dynamodb.Attribute(
+                name="upload_bucket",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="uploaded_at",
+                type=dynamodb.AttributeType.STRING
+            )
+        )
+
+        # createMusicBatch client_token records, expired by TTL after a day
+        idempotency_table = dynamodb.Table(self, "AudioByteIdempotency",
+            table_name="audiobyte-idempotency-6203",
+            partition_key=dynamodb.Attribute(
+                name="token_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="expires_at",
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # Changing the shard count requires re-running backfill_upload_buckets.py
+        upload_shards = "4"
+        # Oldest upload month listAllMusic(order: NEWEST) pages back to;
+        # backfill_upload_buckets.py reports it
+        catalog_start_month = "2024-01"
+
         code_path = "../Backend/runtime"
 
         upload_fn = _lambda.Function(self, "UploadFunction",
@@ -148,7 +204,23 @@ class InfrastructureStack(Stack):
             code=_lambda.Code.from_asset(code_path),
             environment={
                 "BUCKET_NAME": music_bucket.bucket_name,
-                "TABLE_NAME": music_table.table_name
+                "TABLE_NAME": music_table.table_name,
+                "UPLOAD_SHARDS": upload_shards
+            }
+        )
+
+        upload_batch_fn = _lambda.Function(self, "UploadBatchFunction",
+            function_name="audiobyte-upload-batch-6203",
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler="upload_batch_handler.handler",
+            code=_lambda.Code.from_asset(code_path),
+            # 99 rows in one transaction plus 99 presigned URLs
+            timeout=Duration.seconds(15),
+            environment={
+                "BUCKET_NAME": music_bucket.bucket_name,
+                "TABLE_NAME": music_table.table_name,
+                "IDEMPOTENCY_TABLE_NAME": idempotency_table.table_name,
+                "UPLOAD_SHARDS": upload_shards
             }
         )
 
@@ -159,7 +231,8 @@ class InfrastructureStack(Stack):
             code=_lambda.Code.from_asset(code_path),
             environment={
                 "BUCKET_NAME": music_bucket.bucket_name,
-                "TABLE_NAME": music_table.table_name
+                "TABLE_NAME": music_table.table_name,
+                "COVERS_DOMAIN": covers_distribution.distribution_domain_name
             }
         )
 
@@ -168,12 +241,88 @@ class InfrastructureStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_9,
             handler="list_all_handler.handler",
             code=_lambda.Code.from_asset(code_path),
+            # A NEWEST page may query up to 6 months x UPLOAD_SHARDS partitions
+            timeout=Duration.seconds(10),
+            environment={
+                "BUCKET_NAME": music_bucket.bucket_name,
+                "TABLE_NAME": music_table.table_name,
+                "COVERS_DOMAIN": covers_distribution.distribution_domain_name,
+                "UPLOAD_SHARDS": upload_shards,
+                "CATALOG_START_MONTH": catalog_start_month
+            }
+        )
+
+        stream_fn = _lambda.Function(self, "StreamFunction",
+            function_name="audiobyte-stream-6203",
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler="stream_handler.handler",
+            code=_lambda.Code.from_asset(code_path),
             environment={
                 "BUCKET_NAME": music_bucket.bucket_name,
                 "TABLE_NAME": music_table.table_name
             }
         )
 
+        catalog_stream_fn = _lambda.Function(self, "CatalogStreamFunction",
+            function_name="audiobyte-catalog-stream-6203",
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler="catalog_stream_handler.handler",
+            code=_lambda.Code.from_asset(code_path),
+            timeout=Duration.seconds(60),
+            environment={
+                "BUCKET_NAME": music_bucket.bucket_name,
+                "ANALYTICS_BUCKET_NAME": analytics_bucket.bucket_name
+            }
+        )
+
+        # Batches that still fail after retries are recorded here (shard and
+        # sequence range), so the change log never diverges from the table unnoticed
+        catalog_stream_failures = sqs.Queue(self, "CatalogStreamFailures",
+            queue_name="audiobyte-catalog-stream-failures-6203",
+            retention_period=Duration.days(14)
+        )
+
+        catalog_stream_fn.add_event_source(lambda_event_sources.DynamoEventSource(music_table,
+            starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+            batch_size=1000,
+            max_batching_window=Duration.minutes(1),
+            retry_attempts=10,
+            # Halve a failing batch on each retry so one bad record cannot hold back the rest
+            bisect_batch_on_error=True,
+            on_failure=lambda_event_sources.SqsDlq(catalog_stream_failures)
+        ))
+
+        imaging_layer = _lambda.LayerVersion(self, "ImagingLayer",
+            code=_lambda.Code.from_asset("../Backend/layers/imaging",
+                bundling=BundlingOptions(
+                    image=_lambda.Runtime.PYTHON_3_9.bundling_image,
+                    command=["bash", "-c", "pip install -r requirements.txt -t /asset-output/python"]
+                )
+            ),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_9]
+        )
+
+        cover_fn = _lambda.Function(self, "CoverArtFunction",
+            function_name="audiobyte-cover-art-6203",
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler="cover_art_handler.handler",
+            code=_lambda.Code.from_asset(code_path),
+            layers=[imaging_layer],
+            memory_size=512,
+            timeout=Duration.seconds(30),
+            environment={
+                "TABLE_NAME": music_table.table_name,
+                "BUCKET_NAME": music_bucket.bucket_name,
+                "COVERS_DOMAIN": covers_distribution.distribution_domain_name
+            }
+        )
+
+        music_bucket.add_event_notification(
+            s3.EventType.OBJECT_CREATED,
+            s3n.LambdaDestination(cover_fn),
+            s3.NotificationKeyFilter(prefix="music/", suffix=".mp3")
+        )
+
         delete_fn = _lambda.Function(self, "DeleteFunction",
             function_name="audiobyte-delete-6203",
             runtime=_lambda.Runtime.PYTHON_3_9,
@@ -181,18 +330,27 @@ class InfrastructureStack(Stack):
             code=_lambda.Code.from_asset(code_path),
             environment={
                 "BUCKET_NAME": music_bucket.bucket_name,
-                "TABLE_NAME": music_table.table_name
+                "TABLE_NAME": music_table.table_name,
+                "COVERS_DOMAIN": covers_distribution.distribution_domain_name
             }
         )
 
         music_bucket.grant_put(upload_fn)
-        music_bucket.grant_read(list_fn)
-        music_bucket.grant_read(list_all_fn)
+        music_bucket.grant_put(upload_batch_fn)
+        music_bucket.grant_read(stream_fn)
         music_bucket.grant_delete(delete_fn)
+        music_bucket.grant_read(cover_fn, "music/*")
+        music_bucket.grant_put(cover_fn, "covers/*")
+        music_bucket.grant_delete(cover_fn, "covers/*")
+        analytics_bucket.grant_put(catalog_stream_fn)
         music_table.grant_read_write_data(upload_fn)
+        music_table.grant_read_write_data(upload_batch_fn)
+        idempotency_table.grant_read_write_data(upload_batch_fn)
         music_table.grant_read_data(list_fn)
         music_table.grant_read_data(list_all_fn)
+        music_table.grant_read_data(stream_fn)
         music_table.grant_read_write_data(delete_fn)
+        music_table.grant_read_write_data(cover_fn)
 
         # GraphQL API with AppSync
         graphql_api = appsync.GraphqlApi(self, "AudioByteGraphQL",
@@ -208,6 +366,9 @@ class InfrastructureStack(Stack):
                 additional_authorization_modes=[
                     appsync.AuthorizationMode(
                         authorization_type=appsync.AuthorizationType.API_KEY
+                    ),
+                    appsync.AuthorizationMode(
+                        authorization_type=appsync.AuthorizationType.IAM
                     )
                 ]
             ),
@@ -224,6 +385,11 @@ class InfrastructureStack(Stack):
             upload_fn
         )
 
+        upload_batch_data_source = graphql_api.add_lambda_data_source(
+            "UploadBatchDataSource",
+            upload_batch_fn
+        )
+
         list_data_source = graphql_api.add_lambda_data_source(
             "ListDataSource",
             list_fn
@@ -234,11 +400,21 @@ class InfrastructureStack(Stack):
             list_all_fn
         )
 
+        stream_data_source = graphql_api.add_lambda_data_source(
+            "StreamDataSource",
+            stream_fn
+        )
+
         delete_data_source = graphql_api.add_lambda_data_source(
             "DeleteDataSource",
             delete_fn
         )
 
+        # Local (NONE) data source: publishes subscription payloads without touching the table
+        publish_data_source = graphql_api.add_none_data_source(
+            "PublishDataSource"
+        )
+
         list_data_source.create_resolver("ListMusicResolver",
             type_name="Query",
             field_name="listMusic"
@@ -249,11 +425,42 @@ class InfrastructureStack(Stack):
             field_name="listAllMusic"
         )
 
+        stream_data_source.create_resolver("GetStreamUrlsResolver",
+            type_name="Query",
+            field_name="getStreamUrls"
+        )
+
         music_data_source.create_resolver("GetMusicResolver",
             type_name="Query",
             field_name="getMusic",
             request_mapping_template=appsync.MappingTemplate.dynamo_db_get_item("music_id", "music_id"),
-            response_mapping_template=appsync.MappingTemplate.dynamo_db_result_item()
+            # Expands compact (v2) rows into the Music shape; legacy rows pass through
+            response_mapping_template=appsync.MappingTemplate.from_string(
+                '#if($util.isNull($ctx.result))\n'
+                '  $util.toJson(null)\n'
+                '#else\n'
+                '#set($item = $ctx.result)\n'
+                '#if($util.isNull($item.v) || $item.v < 2)\n'
+                '  #set($music = $item)\n'
+                '#else\n'
+                '  #set($key = $util.defaultIfNull($item.k, "music/${item.u}/${item.music_id}.mp3"))\n'
+                '  #set($music = {})\n'
+                '  $util.qr($music.put("music_id", $item.music_id))\n'
+                '  $util.qr($music.put("title", $item.t))\n'
+                '  $util.qr($music.put("artist", $item.ar))\n'
+                '  $util.qr($music.put("album", $util.defaultIfNull($item.al, "")))\n'
+                '  $util.qr($music.put("duration", $item.d))\n'
+                '  $util.qr($music.put("file_url", "https://' + music_bucket.bucket_name + '.s3.amazonaws.com/${key}"))\n'
+                '  $util.qr($music.put("uploaded_at", $item.uploaded_at))\n'
+                '  $util.qr($music.put("user_id", $item.u))\n'
+                '  $util.qr($music.put("username", $item.un))\n'
+                '#end\n'
+                '#if($item.cv)\n'
+                '  $util.qr($music.put("cover_url", "https://' + covers_distribution.distribution_domain_name + '/${item.music_id}/${item.cv}/160.webp"))\n'
+                '#end\n'
+                '$util.toJson($music)\n'
+                '#end'
+            )
         )
 
         upload_data_source.create_resolver("CreateMusicResolver",
@@ -261,11 +468,46 @@ class InfrastructureStack(Stack):
             field_name="createMusic"
         )
 
+        upload_batch_data_source.create_resolver("CreateMusicBatchResolver",
+            type_name="Mutation",
+            field_name="createMusicBatch"
+        )
+
         delete_data_source.create_resolver("DeleteMusicResolver",
             type_name="Mutation",
             field_name="deleteMusic"
         )
 
+        publish_data_source.create_resolver("PublishMusicCreatedResolver",
+            type_name="Mutation",
+            field_name="publishMusicCreated",
+            request_mapping_template=appsync.MappingTemplate.from_string(
+                '{"version": "2018-05-29", "payload": $util.toJson($ctx.args.music)}'
+            ),
+            response_mapping_template=appsync.MappingTemplate.from_string(
+                '$util.qr($ctx.result.put("change", "CREATED"))\n$util.toJson($ctx.result)'
+            )
+        )
+
+        # Only let users subscribe to their own library changes
+        publish_data_source.create_resolver("OnMyMusicChangedResolver",
+            type_name="Subscription",
+            field_name="onMyMusicChanged",
+            request_mapping_template=appsync.MappingTemplate.from_string(
+                '#if($ctx.args.user_id != $ctx.identity.sub)\n'
+                '  $util.unauthorized()\n'
+                '#end\n'
+                '{"version": "2018-05-29", "payload": {}}'
+            ),
+            response_mapping_template=appsync.MappingTemplate.from_string(
+                '$util.toJson(null)'
+            )
+        )
+
+        # New tracks reach subscribers via publishMusicCreated once their file is uploaded
+        cover_fn.add_environment("GRAPHQL_URL", graphql_api.graphql_url)
+        graphql_api.grant_mutation(cover_fn, "publishMusicCreated")
+
 
         dashboard = cloudwatch.Dashboard(self, "AudioByteDashboard",
             dashboard_name="AudioByte-Monitoring-6203"
@@ -277,8 +519,12 @@ class InfrastructureStack(Stack):
                 title="Lambda Invocations",
                 left=[
                     upload_fn.metric_invocations(statistic="Sum", period=Duration.minutes(5)),
+                    upload_batch_fn.metric_invocations(statistic="Sum", period=Duration.minutes(5)),
                     list_fn.metric_invocations(statistic="Sum", period=Duration.minutes(5)),
                     list_all_fn.metric_invocations(statistic="Sum", period=Duration.minutes(5)),
+                    stream_fn.metric_invocations(statistic="Sum", period=Duration.minutes(5)),
+                    catalog_stream_fn.metric_invocations(statistic="Sum", period=Duration.minutes(5)),
+                    cover_fn.metric_invocations(statistic="Sum", period=Duration.minutes(5)),
                     delete_fn.metric_invocations(statistic="Sum", period=Duration.minutes(5))
                 ],
                 width=12
@@ -287,8 +533,12 @@ class InfrastructureStack(Stack):
                 title="Lambda Errors",
                 left=[
                     upload_fn.metric_errors(statistic="Sum", period=Duration.minutes(5)),
+                    upload_batch_fn.metric_errors(statistic="Sum", period=Duration.minutes(5)),
                     list_fn.metric_errors(statistic="Sum", period=Duration.minutes(5)),
                     list_all_fn.metric_errors(statistic="Sum", period=Duration.minutes(5)),
+                    stream_fn.metric_errors(statistic="Sum", period=Duration.minutes(5)),
+                    catalog_stream_fn.metric_errors(statistic="Sum", period=Duration.minutes(5)),
+                    cover_fn.metric_errors(statistic="Sum", period=Duration.minutes(5)),
                     delete_fn.metric_errors(statistic="Sum", period=Duration.minutes(5))
                 ],
                 width=12
@@ -300,8 +550,12 @@ class InfrastructureStack(Stack):
                 title="Lambda Duration",
                 left=[
                     upload_fn.metric_duration(statistic="Average", period=Duration.minutes(5)),
+                    upload_batch_fn.metric_duration(statistic="Average", period=Duration.minutes(5)),
                     list_fn.metric_duration(statistic="Average", period=Duration.minutes(5)),
                     list_all_fn.metric_duration(statistic="Average", period=Duration.minutes(5)),
+                    stream_fn.metric_duration(statistic="Average", period=Duration.minutes(5)),
+                    catalog_stream_fn.metric_duration(statistic="Average", period=Duration.minutes(5)),
+                    cover_fn.metric_duration(statistic="Average", period=Duration.minutes(5)),
                     delete_fn.metric_duration(statistic="Average", period=Duration.minutes(5))
                 ],
                 width=12
@@ -310,8 +564,12 @@ class InfrastructureStack(Stack):
                 title="Lambda Throttles",
                 left=[
                     upload_fn.metric_throttles(statistic="Sum", period=Duration.minutes(5)),
+                    upload_batch_fn.metric_throttles(statistic="Sum", period=Duration.minutes(5)),
                     list_fn.metric_throttles(statistic="Sum", period=Duration.minutes(5)),
                     list_all_fn.metric_throttles(statistic="Sum", period=Duration.minutes(5)),
+                    stream_fn.metric_throttles(statistic="Sum", period=Duration.minutes(5)),
+                    catalog_stream_fn.metric_throttles(statistic="Sum", period=Duration.minutes(5)),
+                    cover_fn.metric_throttles(statistic="Sum", period=Duration.minutes(5)),
                     delete_fn.metric_throttles(statistic="Sum", period=Duration.minutes(5))
                 ],
                 width=12
@@ -339,6 +597,18 @@ class InfrastructureStack(Stack):
             )
         )
 
+        dashboard.add_widgets(
+            cloudwatch.GraphWidget(
+                title="Catalog Stream Failed Batches",
+                left=[
+                    catalog_stream_failures.metric_approximate_number_of_messages_visible(
+                        statistic="Maximum", period=Duration.minutes(5)
+                    )
+                ],
+                width=12
+            )
+        )
+
         # AppSync metrics
         appsync_4xx = cloudwatch.Metric(
             namespace="AWS/AppSync",
@@ -443,11 +713,36 @@ class InfrastructureStack(Stack):
             description="Upload Lambda Function ARN"
         )
 
+        CfnOutput(self, "UploadBatchFunctionArn",
+            value=upload_batch_fn.function_arn,
+            description="Upload Batch Lambda Function ARN"
+        )
+
         CfnOutput(self, "ListFunctionArn",
             value=list_fn.function_arn,
             description="List Lambda Function ARN"
         )
 
+        CfnOutput(self, "StreamFunctionArn",
+            value=stream_fn.function_arn,
+            description="Stream Lambda Function ARN"
+        )
+
+        CfnOutput(self, "CatalogStreamFailuresQueueUrl",
+            value=catalog_stream_failures.queue_url,
+            description="Catalog stream batches that exhausted their retries"
+        )
+
+        CfnOutput(self, "AnalyticsBucketName",
+            value=analytics_bucket.bucket_name,
+            description="Catalog Analytics Bucket"
+        )
+
+        CfnOutput(self, "CoversDomain",
+            value=covers_distribution.distribution_domain_name,
+            description="Cover Art CDN Domain"
+        )
+
         CfnOutput(self, "DeleteFunctionArn",
             value=delete_fn.function_arn,
             description="Delete Lambda Function ARN"
@@ -0,0 +1,42 @@
+#Run a versioned data migration over the music table
+
+
+import argparse
+import sys
+
+from migrations import MIGRATIONS
+from migrations.runner import run_migration
+
+DYNAMODB_TABLE = "audiobyte-metadata-6203"
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a data migration over the music table")
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    parser.add_argument("--table", default=DYNAMODB_TABLE)
+    parser.add_argument("--segments", type=int, default=8, help="parallel scan TotalSegments")
+    parser.add_argument("--workers", type=int, default=None, help="worker threads (default: one per segment)")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: migration-<name>.json)")
+    parser.add_argument("--max-rcu", type=float, default=None, help="read capacity units per second")
+    parser.add_argument("--max-wcu", type=float, default=None, help="write capacity units per second")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        run_migration(
+            args.table,
+            MIGRATIONS[args.migration],
+            total_segments=args.segments,
+            workers=args.workers,
+            checkpoint_path=args.checkpoint or f"migration-{args.migration}.json",
+            max_read_units=args.max_rcu,
+            max_write_units=args.max_wcu,
+            page_size=args.page_size,
+            dry_run=args.dry_run
+        )
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
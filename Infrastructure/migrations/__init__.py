@@ -0,0 +1,11 @@
+from runtime_path import use_backend_runtime
+
+# Migrations share the row codecs with the Lambda handlers
+use_backend_runtime()
+
+from migrations.compact_items import CompactItems
+
+MIGRATIONS = {
+    migration.name: migration
+    for migration in (CompactItems(),)
+}
@@ -0,0 +1,18 @@
+from migrations.runner import Migration
+from music_items import SCHEMA_VERSION, encode_item
+
+
+class CompactItems(Migration):
+    """
+    v1 -> v2: short attribute names, no stored file_url, and s3_key only when
+    it differs from music/<user_id>/<music_id>.mp3. See music_items.py.
+    """
+    name = 'compact_items'
+    version = SCHEMA_VERSION
+
+    def transform(self, item):
+        if 'uploaded_at' not in item:
+            print(f" Skipping {item['music_id']} (no uploaded_at)")
+            return None
+        # Legacy rows without s3_key were stored under music/<music_id>.mp3
+        return encode_item({'s3_key': f"music/{item['music_id']}.mp3", **item})
@@ -0,0 +1,218 @@
+import os
+import abc
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import ClientError
+
+from capacity import CapacityLimiter, consumed_units
+
+
+class Migration(abc.ABC):
+    """
+    A versioned transform over every row of a table.
+    transform() returns the replacement item, or None to leave the row alone.
+    Rows are rewritten only while their 'v' attribute is below `version`.
+    """
+    name = None
+    version = None
+
+    @abc.abstractmethod
+    def transform(self, item):
+        """Replacement for the scanned `item`, or None to leave it alone."""
+
+
+class Checkpoint:
+    """Per-segment scan position and counters, persisted as JSON after every page."""
+
+    def __init__(self, path, migration, total_segments):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {
+            'migration': migration.name,
+            'version': migration.version,
+            'total_segments': total_segments,
+            'segments': {}
+        }
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if (saved.get('migration'), saved.get('version'), saved.get('total_segments')) != \
+                    (migration.name, migration.version, total_segments):
+                raise Exception(f"Checkpoint {path} belongs to a different migration run")
+            self.state = saved
+        # Create every segment up front so save() never sees the dict grow
+        for segment in range(total_segments):
+            self.segment(segment)
+
+    def segment(self, segment):
+        return self.state['segments'].setdefault(str(segment), {
+            'last_key': None,
+            'done': False,
+            'scanned': 0,
+            'migrated': 0,
+            'skipped': 0,
+            'failed': 0
+        })
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f, indent=2, default=str)
+            os.replace(tmp_path, self.path)
+
+    def totals(self):
+        totals = {'scanned': 0, 'migrated': 0, 'skipped': 0, 'failed': 0}
+        for segment in self.state['segments'].values():
+            for key in totals:
+                totals[key] += segment[key]
+        return totals
+
+
+def update_for(item, new_item, version):
+    """
+    UpdateItem arguments that turn the scanned `item` into `new_item` one
+    attribute at a time, or None when nothing changes. Attributes the
+    transform leaves as they were (e.g. a cv or upload_bucket written since
+    the scan) are not touched. Removed attributes must still hold their
+    scanned values, because the attributes replacing them were derived from
+    those values.
+    """
+    names = {'#k': 'music_id', '#v': 'v'}
+    values = {':version': version}
+    sets, removes, checks = [], [], []
+
+    def placeholder(attribute):
+        if attribute == 'v':
+            return '#v'
+        key = f"#a{len(names)}"
+        names[key] = attribute
+        return key
+
+    for attribute, value in sorted(new_item.items()):
+        if attribute == 'music_id' or item.get(attribute) == value:
+            continue
+        name = placeholder(attribute)
+        values[f":s{len(values)}"] = value
+        sets.append(f"{name} = :s{len(values) - 1}")
+
+    for attribute in sorted(set(item) - set(new_item)):
+        name = placeholder(attribute)
+        values[f":r{len(values)}"] = item[attribute]
+        removes.append(name)
+        checks.append(f"{name} = :r{len(values) - 1}")
+
+    if not sets and not removes:
+        return None
+
+    update = []
+    if sets:
+        update.append('SET ' + ', '.join(sets))
+    if removes:
+        update.append('REMOVE ' + ', '.join(removes))
+    # Never resurrect a deleted row or clobber one already migrated
+    condition = ' AND '.join(['attribute_exists(#k)', '(attribute_not_exists(#v) OR #v < :version)'] + checks)
+    return {
+        'Key': {'music_id': item['music_id']},
+        'UpdateExpression': ' '.join(update),
+        'ConditionExpression': condition,
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }
+
+
+def migrate_segment(table_name, migration, segment, total_segments, checkpoint,
+                    read_limiter, write_limiter, page_size, dry_run):
+    # boto3 resources are not thread safe, so every worker gets its own
+    table = boto3.session.Session().resource('dynamodb').Table(table_name)
+    progress = checkpoint.segment(segment)
+    if progress['done']:
+        return
+
+    scan_kwargs = {
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'Limit': page_size,
+        'ReturnConsumedCapacity': 'TOTAL'
+    }
+    if progress['last_key']:
+        scan_kwargs['ExclusiveStartKey'] = progress['last_key']
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        read_limiter.consume(consumed_units(response))
+
+        for item in response.get('Items', []):
+            progress['scanned'] += 1
+            if int(item.get('v', 1)) >= migration.version:
+                progress['skipped'] += 1
+                continue
+
+            new_item = migration.transform(item)
+            update = update_for(item, new_item, migration.version) if new_item is not None else None
+            if update is None:
+                progress['skipped'] += 1
+                continue
+            if dry_run:
+                progress['migrated'] += 1
+                continue
+
+            try:
+                write = table.update_item(**update, ReturnConsumedCapacity='TOTAL')
+                write_limiter.consume(consumed_units(write))
+                progress['migrated'] += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                    progress['skipped'] += 1
+                else:
+                    progress['failed'] += 1
+                    print(f" Failed to migrate {item.get('music_id')}: {str(e)}")
+
+        progress['last_key'] = response.get('LastEvaluatedKey')
+        if not progress['last_key']:
+            progress['done'] = True
+        checkpoint.save()
+
+        if progress['done']:
+            return
+        scan_kwargs['ExclusiveStartKey'] = progress['last_key']
+
+
+def run_migration(table_name, migration, total_segments=8, workers=None, checkpoint_path=None,
+                  max_read_units=None, max_write_units=None, page_size=100, dry_run=False):
+    """
+    Apply `migration` to every row with a parallel Segment/TotalSegments scan.
+    Re-running with the same checkpoint resumes where each segment stopped.
+    """
+    # A dry run must not mark segments done in a real checkpoint
+    checkpoint = Checkpoint(None if dry_run else checkpoint_path, migration, total_segments)
+    read_limiter = CapacityLimiter(max_read_units)
+    write_limiter = CapacityLimiter(max_write_units)
+
+    print(f"Running migration {migration.name} (v{migration.version}) on {table_name} "
+          f"with {total_segments} segment(s){' [dry run]' if dry_run else ''}")
+
+    with ThreadPoolExecutor(max_workers=workers or total_segments) as pool:
+        futures = [
+            pool.submit(migrate_segment, table_name, migration, segment, total_segments, checkpoint,
+                        read_limiter, write_limiter, page_size, dry_run)
+            for segment in range(total_segments)
+        ]
+        errors = []
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+                print(f" Segment failed: {str(e)}")
+
+    totals = checkpoint.totals()
+    print(f"Migration {migration.name} finished: {totals}")
+    if errors:
+        raise Exception(f"{len(errors)} segment(s) failed; re-run with the same checkpoint to resume")
+    return totals
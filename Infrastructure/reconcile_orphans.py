@@ -0,0 +1,266 @@
+#Find (and optionally delete) S3 objects without metadata rows and rows without S3 objects
+#Cover thumbnails no row's cv points at are treated as orphan objects too
+
+
+import argparse
+import datetime
+import heapq
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from capacity import CapacityLimiter, consumed_units
+from runtime_path import use_backend_runtime
+
+use_backend_runtime()
+from music_items import decode_item, COVER_PREFIX, cover_path
+
+DYNAMODB_TABLE = "audiobyte-metadata-6203"
+S3_BUCKET = "audiobyte-music-6203"
+MUSIC_PREFIX = "music/"
+COVERS_PREFIX = f"{COVER_PREFIX}/"
+
+# Rows are written before their file is uploaded, so very recent rows and
+# objects are left alone rather than reported as orphans
+DEFAULT_GRACE_HOURS = 24
+S3_DELETE_BATCH = 1000
+
+def write_run(entries, directory):
+    """Spill one sorted run of string tuples to disk."""
+    entries.sort()
+    fd, path = tempfile.mkstemp(prefix="rows-", suffix=".tsv", dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        for entry in entries:
+            f.write("\t".join(entry) + "\n")
+    return path
+
+def read_run(path):
+    with open(path) as f:
+        for line in f:
+            yield tuple(line.rstrip("\n").split("\t"))
+
+def cover_group(music_id):
+    # "<music_id>/" sorts the same way as the covers/<music_id>/ listing
+    return f"{music_id}/"
+
+def spill_segment(table_name, segment, total_segments, read_limiter, run_size, directory):
+    """
+    Scan one segment into sorted on-disk runs of at most run_size rows: track
+    runs of (s3_key, music_id, uploaded_at) and cover runs of
+    (cover group, live cover directory or '').
+    """
+    table = boto3.session.Session().resource('dynamodb').Table(table_name)
+    track_runs, cover_runs = [], []
+    tracks, covers = [], []
+    scan_kwargs = {
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'ProjectionExpression': 'music_id, v, s3_key, k, u, user_id, uploaded_at, cv',
+        'ReturnConsumedCapacity': 'TOTAL'
+    }
+    while True:
+        response = table.scan(**scan_kwargs)
+        read_limiter.consume(consumed_units(response))
+
+        for item in response.get('Items', []):
+            music = decode_item({'uploaded_at': '', **item}, S3_BUCKET)
+            tracks.append((music['s3_key'], music['music_id'], music['uploaded_at']))
+            live = f"{COVERS_PREFIX}{cover_path(item['music_id'], item['cv'])}/" if item.get('cv') else ''
+            covers.append((cover_group(item['music_id']), live))
+            if len(tracks) >= run_size:
+                track_runs.append(write_run(tracks, directory))
+                cover_runs.append(write_run(covers, directory))
+                tracks, covers = [], []
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    if tracks:
+        track_runs.append(write_run(tracks, directory))
+        cover_runs.append(write_run(covers, directory))
+    return track_runs, cover_runs
+
+def sorted_rows(table_name, total_segments, read_limiter, run_size, directory):
+    """
+    All table rows via an external merge sort, as two streams: tracks sorted
+    by s3_key and cover entries sorted by cover group.
+    """
+    with ThreadPoolExecutor(max_workers=total_segments) as pool:
+        futures = [
+            pool.submit(spill_segment, table_name, segment, total_segments, read_limiter, run_size, directory)
+            for segment in range(total_segments)
+        ]
+        results = [future.result() for future in futures]
+    track_runs = [run for runs, _ in results for run in runs]
+    cover_runs = [run for _, runs in results for run in runs]
+    print(f"  Table scanned into {len(track_runs)} sorted run(s)")
+    return (
+        heapq.merge(*(read_run(run) for run in track_runs)),
+        heapq.merge(*(read_run(run) for run in cover_runs))
+    )
+
+def sorted_objects(s3, bucket, prefix):
+    """(key, last_modified) for every object under prefix, in S3's (already sorted) key order."""
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            yield obj['Key'], obj['LastModified']
+
+def diff_sorted(objects, rows):
+    """
+    Merge-join two key-sorted streams, yielding ('object', key, last_modified)
+    for objects with no row and ('row', key, music_id, uploaded_at) for rows
+    with no object. Memory use is constant.
+    """
+    obj = next(objects, None)
+    row = next(rows, None)
+    while obj is not None or row is not None:
+        if row is None or (obj is not None and obj[0] < row[0]):
+            yield ('object',) + obj
+            obj = next(objects, None)
+        elif obj is None or row[0] < obj[0]:
+            yield ('row',) + row
+            row = next(rows, None)
+        else:
+            # Several rows may share a key; advance rows and keep the object
+            # until the next row key moves past it
+            row = next(rows, None)
+            if row is None or row[0] != obj[0]:
+                obj = next(objects, None)
+
+def diff_covers(objects, covers):
+    """
+    Merge-join cover objects against rows' cover entries, both ordered by
+    cover group, yielding (key, last_modified) for thumbnails that are not in
+    their track's live cover directory (deleted tracks, replaced art).
+    """
+    cover = next(covers, None)
+    for key, last_modified in objects:
+        group = cover_group(key[len(COVERS_PREFIX):].split('/', 1)[0])
+        while cover is not None and cover[0] < group:
+            cover = next(covers, None)
+        live = cover[1] if cover is not None and cover[0] == group else ''
+        if not live or key.rsplit('/', 1)[0] + '/' != live:
+            yield key, last_modified
+
+class OrphanSink:
+    """Reports orphans to an NDJSON file and, with delete=True, removes them in batches."""
+
+    def __init__(self, table_name, bucket, report_path, delete):
+        self.table = boto3.resource('dynamodb').Table(table_name)
+        self.s3 = boto3.client('s3')
+        self.bucket = bucket
+        self.delete = delete
+        self.report = open(report_path, 'w')
+        self.pending_objects = []
+        self.pending_rows = []
+        self.counts = {'orphan_objects': 0, 'orphan_rows': 0, 'failed': 0}
+
+    def add_object(self, key):
+        self.counts['orphan_objects'] += 1
+        self.report.write(json.dumps({'type': 'object', 'key': key}) + "\n")
+        if self.delete:
+            self.pending_objects.append(key)
+            if len(self.pending_objects) >= S3_DELETE_BATCH:
+                self.flush_objects()
+
+    def add_row(self, key, music_id):
+        self.counts['orphan_rows'] += 1
+        self.report.write(json.dumps({'type': 'row', 'key': key, 'music_id': music_id}) + "\n")
+        if self.delete:
+            self.pending_rows.append(music_id)
+            if len(self.pending_rows) >= S3_DELETE_BATCH:
+                self.flush_rows()
+
+    def flush_objects(self):
+        if not self.pending_objects:
+            return
+        response = self.s3.delete_objects(
+            Bucket=self.bucket,
+            Delete={'Objects': [{'Key': key} for key in self.pending_objects], 'Quiet': True}
+        )
+        for error in response.get('Errors', []):
+            self.counts['failed'] += 1
+            print(f" Failed to delete object {error['Key']}: {error.get('Message')}")
+        self.pending_objects = []
+
+    def flush_rows(self):
+        if not self.pending_rows:
+            return
+        with self.table.batch_writer() as batch:
+            for music_id in self.pending_rows:
+                batch.delete_item(Key={'music_id': music_id})
+        self.pending_rows = []
+
+    def close(self):
+        self.flush_objects()
+        self.flush_rows()
+        self.report.close()
+
+def reconcile(table_name, bucket, report_path, delete=False, total_segments=8, max_read_units=None,
+              run_size=200000, grace_hours=DEFAULT_GRACE_HOURS):
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=grace_hours)
+    cutoff_iso = cutoff.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    read_limiter = CapacityLimiter(max_read_units)
+
+    print(f"Reconciling s3://{bucket}/{MUSIC_PREFIX} and {COVERS_PREFIX} against {table_name}"
+          f"{'' if delete else ' [report only]'}")
+
+    sink = OrphanSink(table_name, bucket, report_path, delete)
+    s3 = boto3.client('s3')
+    with tempfile.TemporaryDirectory(prefix="reconcile-") as directory:
+        rows, covers = sorted_rows(table_name, total_segments, read_limiter, run_size, directory)
+        try:
+            for orphan in diff_sorted(sorted_objects(s3, bucket, MUSIC_PREFIX), rows):
+                if orphan[0] == 'object':
+                    _, key, last_modified = orphan
+                    if last_modified < cutoff:
+                        sink.add_object(key)
+                else:
+                    _, key, music_id, uploaded_at = orphan
+                    if uploaded_at and uploaded_at < cutoff_iso:
+                        sink.add_row(key, music_id)
+
+            for key, last_modified in diff_covers(sorted_objects(s3, bucket, COVERS_PREFIX), covers):
+                if last_modified < cutoff:
+                    sink.add_object(key)
+        finally:
+            sink.close()
+
+    print(f"Reconciliation complete! {sink.counts} (report: {report_path})")
+    return sink.counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile S3 music objects with metadata rows")
+    parser.add_argument("--table", default=DYNAMODB_TABLE)
+    parser.add_argument("--bucket", default=S3_BUCKET)
+    parser.add_argument("--report", default="orphans.ndjson")
+    parser.add_argument("--delete", action="store_true", help="delete orphans instead of only reporting them")
+    parser.add_argument("--segments", type=int, default=8, help="parallel scan TotalSegments")
+    parser.add_argument("--max-rcu", type=float, default=None, help="read capacity units per second")
+    parser.add_argument("--run-size", type=int, default=200000, help="rows per sorted spill file")
+    parser.add_argument("--grace-hours", type=float, default=DEFAULT_GRACE_HOURS)
+    args = parser.parse_args()
+
+    try:
+        reconcile(
+            args.table,
+            args.bucket,
+            args.report,
+            delete=args.delete,
+            total_segments=args.segments,
+            max_read_units=args.max_rcu,
+            run_size=args.run_size,
+            grace_hours=args.grace_hours
+        )
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
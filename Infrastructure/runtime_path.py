@@ -0,0 +1,12 @@
+#Make Backend/runtime importable from the scripts in this directory
+
+
+import os
+import sys
+
+RUNTIME_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend", "runtime"))
+
+def use_backend_runtime():
+    """Put Backend/runtime on sys.path so scripts share the Lambda handlers' modules."""
+    if RUNTIME_DIR not in sys.path:
+        sys.path.insert(0, RUNTIME_DIR)
@@ -0,0 +1,8 @@
+import os
+
+from runtime_path import use_backend_runtime
+
+# Backend/runtime handlers are tested in place; their module-level boto3
+# clients only need a region to construct
+use_backend_runtime()
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,224 @@
+import zlib
+from decimal import Decimal
+
+import pytest
+from botocore.exceptions import ClientError
+
+import cover_art_handler
+import music_items
+from cover_art_handler import extract_cover, find_cover, syncsafe
+
+# JPEG-like payloads with 0xFF bytes, so unsynchronisation actually changes them
+FRONT = b'\xff\xd8\xff\xe0front\xff\x00\xff\xd9'
+BACK = b'\xff\xd8\xff\xe0back\xff\xd9'
+
+
+def to_syncsafe(value):
+    return bytes([(value >> 21) & 0x7f, (value >> 14) & 0x7f, (value >> 7) & 0x7f, value & 0x7f])
+
+
+def unsync(data):
+    return data.replace(b'\xff', b'\xff\x00')
+
+
+def apic_body(image, picture_type=3, encoding=0, description=b'cover'):
+    terminator = b'\x00\x00' if encoding in (1, 2) else b'\x00'
+    return bytes([encoding]) + b'image/jpeg\x00' + bytes([picture_type]) + description + terminator + image
+
+
+def v22_frame(image, picture_type=3):
+    body = b'\x00JPG' + bytes([picture_type]) + b'cover\x00' + image
+    return b'PIC' + len(body).to_bytes(3, 'big') + body
+
+
+def v23_frame(image, picture_type=3, flags=0):
+    body = apic_body(image, picture_type)
+    if flags & 0x80:
+        body = len(body).to_bytes(4, 'big') + zlib.compress(body)
+    return b'APIC' + len(body).to_bytes(4, 'big') + bytes([0, flags]) + body
+
+
+def v24_frame(image, picture_type=3, unsynchronised=False, data_length=False):
+    body = apic_body(image, picture_type)
+    flags = 0
+    if data_length:
+        flags |= 0x01
+        body = to_syncsafe(len(body)) + body
+    if unsynchronised:
+        flags |= 0x02
+        body = unsync(body)
+    return b'APIC' + to_syncsafe(len(body)) + bytes([0, flags]) + body
+
+
+def text_frame(major, text=b'\x00Title'):
+    if major == 2:
+        return b'TT2' + len(text).to_bytes(3, 'big') + text
+    size = to_syncsafe(len(text)) if major == 4 else len(text).to_bytes(4, 'big')
+    return b'TIT2' + size + b'\x00\x00' + text
+
+
+def test_v22_pic():
+    tag = text_frame(2) + v22_frame(FRONT) + b'\x00' * 16
+    assert find_cover(tag, 2) == FRONT
+
+
+def test_v23_apic():
+    tag = text_frame(3) + v23_frame(FRONT) + b'\x00' * 16
+    assert find_cover(tag, 3) == FRONT
+
+
+def test_v23_compressed_apic():
+    assert find_cover(v23_frame(FRONT, flags=0x80), 3) == FRONT
+
+
+def test_v23_skips_oversized_compressed_apic(monkeypatch):
+    monkeypatch.setattr(cover_art_handler, 'MAX_TAG_BYTES', len(apic_body(FRONT)))
+    assert find_cover(v23_frame(FRONT, flags=0x80) + v23_frame(BACK, picture_type=4), 3) == BACK
+
+
+def test_v23_skips_encrypted_apic():
+    assert find_cover(v23_frame(FRONT, flags=0x40) + v23_frame(BACK, picture_type=4), 3) == BACK
+
+
+@pytest.mark.parametrize("unsynchronised", [False, True])
+@pytest.mark.parametrize("data_length", [False, True])
+def test_v24_apic_frame_flags(unsynchronised, data_length):
+    tag = text_frame(4) + v24_frame(FRONT, unsynchronised=unsynchronised, data_length=data_length)
+    assert find_cover(tag, 4) == FRONT
+
+
+def test_prefers_front_cover():
+    tag = v24_frame(BACK, picture_type=4) + v24_frame(FRONT, picture_type=3)
+    assert find_cover(tag, 4) == FRONT
+
+
+def test_falls_back_to_first_picture():
+    tag = v23_frame(BACK, picture_type=4) + v23_frame(FRONT, picture_type=0)
+    assert find_cover(tag, 3) == BACK
+
+
+def test_utf16_description():
+    body = apic_body(FRONT, encoding=1, description='Cövér'.encode('utf-16'))
+    tag = b'APIC' + len(body).to_bytes(4, 'big') + b'\x00\x00' + body
+    assert find_cover(tag, 3) == FRONT
+
+
+def test_no_picture():
+    assert find_cover(text_frame(3) + b'\x00' * 32, 3) is None
+
+
+def id3_file(major, tag, flags=0):
+    return b'ID3' + bytes([major, 0, flags]) + to_syncsafe(len(tag)) + tag + b'\xff\xfbaudio'
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    files = {}
+
+    def read_range(bucket, key, start, length):
+        return files[key][start:start + length]
+
+    monkeypatch.setattr(cover_art_handler, 'read_range', read_range)
+    return files
+
+
+@pytest.mark.parametrize("major, frame", [
+    (2, v22_frame(FRONT)),
+    (3, v23_frame(FRONT)),
+    (4, v24_frame(FRONT, unsynchronised=True, data_length=True)),
+])
+def test_extract_cover(fake_s3, major, frame):
+    fake_s3['music/u/a.mp3'] = id3_file(major, text_frame(major) + frame)
+    assert extract_cover('bucket', 'music/u/a.mp3') == FRONT
+
+
+def test_extract_cover_tag_unsynchronisation(fake_s3):
+    # v2.3 unsynchronises the whole tag, flagged in the tag header
+    fake_s3['music/u/a.mp3'] = id3_file(3, unsync(text_frame(3) + v23_frame(FRONT)), flags=0x80)
+    assert extract_cover('bucket', 'music/u/a.mp3') == FRONT
+
+
+def test_extract_cover_extended_header(fake_s3):
+    extended = to_syncsafe(6) + b'\x01\x00'
+    fake_s3['music/u/a.mp3'] = id3_file(4, extended + v24_frame(FRONT), flags=0x40)
+    assert extract_cover('bucket', 'music/u/a.mp3') == FRONT
+
+
+def test_extract_cover_without_tag(fake_s3):
+    fake_s3['music/u/a.mp3'] = b'\xff\xfbaudio-only-file'
+    assert extract_cover('bucket', 'music/u/a.mp3') is None
+
+
+def test_syncsafe_round_trip():
+    assert syncsafe(to_syncsafe(300000)) == 300000
+
+
+UPLOAD_EVENT = {'Records': [{'s3': {'bucket': {'name': 'bucket'}, 'object': {'key': 'music/u/track-1.mp3'}}}]}
+
+
+def stored_row(**overrides):
+    return {'music_id': 'track-1', 'v': Decimal(2), 'uploaded_at': '2026-10-01T12:00:00.000000Z',
+            't': 'Title', 'ar': 'Artist', 'd': Decimal(215), 'u': 'u', 'un': 'listener', **overrides}
+
+
+@pytest.fixture
+def handler_env(monkeypatch):
+    published, deleted = [], []
+    monkeypatch.setenv('TABLE_NAME', 'music')
+    monkeypatch.setenv('BUCKET_NAME', 'bucket')
+    monkeypatch.setattr(music_items, 'COVERS_DOMAIN', 'covers.example.net')
+    monkeypatch.setattr(cover_art_handler, 'Image', object())
+    monkeypatch.setattr(cover_art_handler, 'write_thumbnails', lambda *args: None)
+    monkeypatch.setattr(cover_art_handler, 'delete_thumbnails', lambda *args: deleted.append(args))
+    monkeypatch.setattr(cover_art_handler, 'publish_music_created', published.append)
+    return published, deleted
+
+
+def test_handler_publishes_track_with_new_cover(handler_env, monkeypatch):
+    published, deleted = handler_env
+    version = cover_art_handler.cover_version(FRONT)
+    monkeypatch.setattr(cover_art_handler, 'extract_cover', lambda bucket, key: FRONT)
+    monkeypatch.setattr(cover_art_handler, 'set_cover_version', lambda table, music_id, v: stored_row(cv='old'))
+
+    cover_art_handler.handler(UPLOAD_EVENT, None)
+    assert deleted == [('bucket', 'track-1', 'old')]
+    assert [track['music_id'] for track in published] == ['track-1']
+    assert published[0]['cover_url'] == f"https://covers.example.net/track-1/{version}/160.webp"
+
+
+def test_handler_publishes_track_without_cover(handler_env, monkeypatch):
+    published, deleted = handler_env
+    monkeypatch.setattr(cover_art_handler, 'extract_cover', lambda bucket, key: None)
+    monkeypatch.setattr(cover_art_handler, 'set_cover_version', lambda table, music_id, v: stored_row())
+
+    cover_art_handler.handler(UPLOAD_EVENT, None)
+    assert deleted == []
+    assert published[0]['title'] == 'Title' and 'cover_url' not in published[0]
+
+
+def test_handler_publishes_without_pillow(handler_env, monkeypatch):
+    published, _ = handler_env
+
+    class Table:
+        def get_item(self, Key):
+            return {'Item': stored_row(cv='abc123')}
+
+    monkeypatch.setattr(cover_art_handler, 'Image', None)
+    monkeypatch.setattr(cover_art_handler.dynamodb, 'Table', lambda name: Table())
+
+    cover_art_handler.handler(UPLOAD_EVENT, None)
+    assert published[0]['cover_url'] == "https://covers.example.net/track-1/abc123/160.webp"
+
+
+def test_handler_removes_thumbnails_of_deleted_track(handler_env, monkeypatch):
+    published, deleted = handler_env
+
+    def set_cover_version(table, music_id, version):
+        raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+
+    monkeypatch.setattr(cover_art_handler, 'extract_cover', lambda bucket, key: FRONT)
+    monkeypatch.setattr(cover_art_handler, 'set_cover_version', set_cover_version)
+
+    cover_art_handler.handler(UPLOAD_EVENT, None)
+    assert deleted == [('bucket', 'track-1', cover_art_handler.cover_version(FRONT))]
+    assert published == []
@@ -6,7 +6,8 @@ from infrastructure.infrastructure_stack import InfrastructureStack
 # example tests. To run these tests, uncomment this file along with the example
 # resource in infrastructure/infrastructure_stack.py
 def test_sqs_queue_created():
-    app = core.App()
+    # Skip Docker asset bundling (the imaging layer) when synthesizing in tests
+    app = core.App(context={"aws:cdk:bundling-stacks": []})
     stack = InfrastructureStack(app, "infrastructure")
     template = assertions.Template.from_stack(stack)
 
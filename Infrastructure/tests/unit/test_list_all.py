@@ -0,0 +1,190 @@
+import datetime
+
+import pytest
+
+import list_all_handler
+from list_all_handler import list_newest, normalize_since, read_month
+from upload_buckets import UPLOADED_AT_INDEX, UPLOAD_SHARDS, previous_month, upload_bucket, upload_shard
+
+
+def months_back(count):
+    month = datetime.datetime.utcnow().strftime('%Y-%m')
+    for _ in range(count):
+        month = previous_month(month)
+    return month
+
+
+def row(music_id, uploaded_at):
+    return {
+        'music_id': {'S': music_id},
+        'v': {'N': '2'},
+        'uploaded_at': {'S': uploaded_at},
+        'upload_bucket': {'S': upload_bucket(uploaded_at, music_id)},
+        't': {'S': f"Title {music_id}"},
+        'ar': {'S': 'Artist'},
+        'd': {'N': '200'},
+        'u': {'S': 'user-1'},
+        'un': {'S': 'listener'},
+    }
+
+
+def timestamp(month, day, second=0):
+    return f"{month}-{day:02d}T12:00:{second:02d}.000000Z"
+
+
+class FakeDynamoDB:
+    """UploadedAtIndex queries over an in-memory list of low-level rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def query(self, **kwargs):
+        self.queries += 1
+        assert kwargs['IndexName'] == UPLOADED_AT_INDEX
+        assert kwargs['ScanIndexForward'] is False
+        values = kwargs['ExpressionAttributeValues']
+        assert (':since' in values) == ('uploaded_at >= :since' in kwargs['KeyConditionExpression'])
+        since = values.get(':since', {'S': ''})['S']
+
+        entries = sorted(
+            (
+                ((item['uploaded_at']['S'], item['music_id']['S']), item)
+                for item in self.rows
+                if item['upload_bucket']['S'] == values[':bucket']['S'] and item['uploaded_at']['S'] >= since
+            ),
+            key=lambda entry: entry[0],
+            reverse=True
+        )
+        start = kwargs.get('ExclusiveStartKey')
+        if start:
+            position = (start['uploaded_at']['S'], start['music_id']['S'])
+            entries = [entry for entry in entries if entry[0] < position]
+
+        page = entries[:kwargs['Limit']]
+        response = {'Items': [item for _, item in page]}
+        # Like DynamoDB, a full page carries LastEvaluatedKey even when nothing follows
+        if len(page) == kwargs['Limit']:
+            last = page[-1][1]
+            response['LastEvaluatedKey'] = {
+                'upload_bucket': last['upload_bucket'],
+                'uploaded_at': last['uploaded_at'],
+                'music_id': last['music_id'],
+            }
+        return response
+
+
+def catalog():
+    current, previous, older, oldest = months_back(0), months_back(1), months_back(3), months_back(9)
+    rows = [row(f"batch-{i:02d}", timestamp(current, 1)) for i in range(20)]
+    rows += [row(f"current-{i}", timestamp(current, 1, i + 1)) for i in range(5)]
+    rows += [row(f"previous-{i}", timestamp(previous, 10 + i)) for i in range(9)]
+    rows += [row(f"older-{i}", timestamp(older, 28, i)) for i in range(3)]
+    # Six empty months between older and oldest exhaust a page's month budget
+    rows += [row("oldest", timestamp(oldest, 15))]
+    # Before CATALOG_START_MONTH, so never listed
+    rows += [row("before-start", timestamp(months_back(12), 1))]
+    return rows
+
+
+@pytest.fixture
+def fake_dynamodb(monkeypatch):
+    fake = FakeDynamoDB(catalog())
+    monkeypatch.setattr(list_all_handler, 'dynamodb', fake)
+    monkeypatch.setattr(list_all_handler, 'CATALOG_START_MONTH', months_back(10))
+    return fake
+
+
+def page_all(limit, since=None):
+    listed, token = [], None
+    for _ in range(1000):
+        items, token = list_newest('music', since, limit, token)
+        assert len(items) <= limit
+        listed.extend(items)
+        if token is None:
+            return listed
+    raise AssertionError("paging did not terminate")
+
+
+def expected(rows, since=''):
+    floor = months_back(10)
+    return sorted(
+        (item for item in rows if item['uploaded_at']['S'] >= since and item['uploaded_at']['S'][:7] >= floor),
+        key=lambda item: item['uploaded_at']['S'],
+        reverse=True
+    )
+
+
+def assert_listed_once_in_order(listed, rows):
+    ids = [music.music_id for music in listed]
+    assert len(ids) == len(set(ids))
+    assert sorted(ids) == sorted(item['music_id']['S'] for item in rows)
+    times = [music.uploaded_at for music in listed]
+    assert times == sorted(times, reverse=True)
+
+
+def test_batch_spreads_over_shards():
+    # Otherwise the tie tests would not cross shard cursors
+    assert len({upload_shard(f"batch-{i:02d}") for i in range(20)}) == UPLOAD_SHARDS
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50])
+def test_pages_list_every_track_once_newest_first(fake_dynamodb, limit):
+    assert_listed_once_in_order(page_all(limit), expected(fake_dynamodb.rows))
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50])
+def test_since_floors_the_walk(fake_dynamodb, limit):
+    since = timestamp(months_back(1), 14)
+    listed = page_all(limit, since)
+    assert_listed_once_in_order(listed, expected(fake_dynamodb.rows, since))
+    assert listed[-1].music_id == 'previous-4'
+
+
+def test_since_stops_at_its_month(fake_dynamodb):
+    list_newest('music', timestamp(months_back(0), 1), 50, None)
+    # Only the current month's shards are queried
+    assert fake_dynamodb.queries == UPLOAD_SHARDS
+
+
+def test_empty_months_end_a_page_with_a_cursor(fake_dynamodb):
+    items, token = list_newest('music', None, 50, None)
+    # older is the last non-empty month within the first page's budget
+    assert len(items) < 50 and items[-1].music_id == 'older-0'
+    assert token is not None
+    items, token = list_newest('music', None, 50, token)
+    assert [music.music_id for music in items] == ['oldest']
+    assert token is None
+
+
+def test_read_month_keeps_a_cursor_per_shard(fake_dynamodb):
+    month = months_back(0)
+    after, done, listed = {}, set(), []
+    while len(done) < UPLOAD_SHARDS:
+        listed.extend(read_month('music', month, None, after, done, 3))
+    assert_listed_once_in_order(listed, [item for item in fake_dynamodb.rows if item['uploaded_at']['S'][:7] == month])
+    assert set(after) == {upload_shard(music.music_id) for music in listed}
+
+
+def test_handler_normalises_since(fake_dynamodb, monkeypatch):
+    monkeypatch.setenv('TABLE_NAME', 'music')
+    monkeypatch.setenv('BUCKET_NAME', 'audiobyte-music-test')
+    # 16:00 local at +02:00 is 14:00 UTC, after previous-4's 12:00 UTC upload
+    since = timestamp(months_back(1), 14).replace('T12:00:00.000000Z', 'T16:00:00+02:00')
+    response = list_all_handler.handler({'arguments': {'order': 'NEWEST', 'since': since}}, None)
+    assert response['items'][-1]['music_id'] == 'previous-5'
+
+
+@pytest.mark.parametrize("since, normalised", [
+    ('2026-10-01T12:00:00Z', '2026-10-01T12:00:00.000000Z'),
+    ('2026-10-01T12:00:00.5Z', '2026-10-01T12:00:00.500000Z'),
+    ('2026-10-01T01:30:00+02:00', '2026-09-30T23:30:00.000000Z'),
+    ('2026-10-01T12:00:00.123456789-05:00', '2026-10-01T17:00:00.123456Z'),
+])
+def test_normalize_since(since, normalised):
+    assert normalize_since(since) == normalised
+
+
+def test_normalize_since_rejects_garbage():
+    with pytest.raises(Exception, match='since'):
+        normalize_since('yesterday')
@@ -0,0 +1,101 @@
+from decimal import Decimal
+
+import pytest
+
+from migrations.compact_items import CompactItems
+from migrations.runner import Migration, update_for
+
+
+def legacy_row(**overrides):
+    row = {
+        'music_id': 'track-1',
+        'title': 'Title',
+        'artist': 'Artist',
+        'album': 'Album',
+        'duration': Decimal(215),
+        'uploaded_at': '2026-10-01T12:00:00.000000Z',
+        'user_id': 'user-1',
+        'username': 'listener',
+        's3_key': 'music/track-1.mp3',
+        'file_url': 'https://bucket.s3.amazonaws.com/music/track-1.mp3',
+        'upload_bucket': '2026-10#1',
+    }
+    row.update(overrides)
+    return row
+
+
+def apply_update(row, update):
+    """Apply update_for output the way DynamoDB would, for the expressions it builds."""
+    names, values = update['ExpressionAttributeNames'], update['ExpressionAttributeValues']
+    row = dict(row)
+    for clause in update['UpdateExpression'].split(' REMOVE '):
+        if clause.startswith('SET '):
+            for assignment in clause[4:].split(', '):
+                name, value = assignment.split(' = ')
+                row[names[name]] = values[value]
+        else:
+            for name in clause.split(', '):
+                row.pop(names[name])
+    return row
+
+
+def condition_holds(row, update):
+    names, values = update['ExpressionAttributeNames'], update['ExpressionAttributeValues']
+    checks = update['ConditionExpression'].split(' AND ')[2:]
+    return all(row.get(names[name]) == values[value] for name, value in (check.split(' = ') for check in checks))
+
+
+def test_migration_is_abstract():
+    with pytest.raises(TypeError):
+        Migration()
+
+
+def test_compact_items_update():
+    row = legacy_row()
+    update = update_for(row, CompactItems().transform(row), CompactItems.version)
+    migrated = apply_update(row, update)
+    assert migrated == {
+        'music_id': 'track-1',
+        'v': 2,
+        't': 'Title',
+        'ar': 'Artist',
+        'al': 'Album',
+        'd': Decimal(215),
+        'u': 'user-1',
+        'un': 'listener',
+        'k': 'music/track-1.mp3',
+        'uploaded_at': '2026-10-01T12:00:00.000000Z',
+        'upload_bucket': '2026-10#1',
+    }
+
+
+def test_update_leaves_concurrent_writes_alone():
+    scanned = legacy_row()
+    update = update_for(scanned, CompactItems().transform(scanned), CompactItems.version)
+    names = set(update['ExpressionAttributeNames'].values())
+    assert 'cv' not in names and 'upload_bucket' not in names
+
+    # A cover written and a re-bucket after the scan both survive the migration
+    current = {**scanned, 'cv': 'abc123', 'upload_bucket': '2026-10#3'}
+    assert condition_holds(current, update)
+    migrated = apply_update(current, update)
+    assert migrated['cv'] == 'abc123'
+    assert migrated['upload_bucket'] == '2026-10#3'
+
+
+def test_update_rejects_changed_source_fields():
+    scanned = legacy_row()
+    update = update_for(scanned, CompactItems().transform(scanned), CompactItems.version)
+    assert not condition_holds({**scanned, 'title': 'Renamed'}, update)
+
+
+def test_update_guards_version_and_existence():
+    scanned = legacy_row()
+    update = update_for(scanned, CompactItems().transform(scanned), CompactItems.version)
+    assert update['ConditionExpression'].startswith('attribute_exists(#k) AND (attribute_not_exists(#v) OR #v < :version)')
+    assert update['ExpressionAttributeValues'][':version'] == 2
+
+
+def test_no_update_when_nothing_changes():
+    row = {'music_id': 'track-1', 'v': 2, 't': 'Title'}
+    assert update_for(row, dict(row), 2) is None
@@ -0,0 +1,120 @@
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+import music_items
+from music_items import SCHEMA_VERSION, decode_item, encode_item, music_from_attributes
+
+BUCKET = "audiobyte-music-test"
+COVERS = "covers.example.net"
+
+
+@pytest.fixture(autouse=True)
+def covers_domain(monkeypatch):
+    monkeypatch.setattr(music_items, 'COVERS_DOMAIN', COVERS)
+
+
+def long_form(**overrides):
+    music = {
+        'music_id': 'track-1',
+        'title': 'Title',
+        'artist': 'Artist',
+        'album': 'Album',
+        'duration': Decimal(215),
+        'uploaded_at': '2026-10-01T12:00:00.000000Z',
+        'user_id': 'user-1',
+        'username': 'listener',
+        's3_key': 'music/user-1/track-1.mp3',
+        'file_url': f"https://{BUCKET}.s3.amazonaws.com/music/user-1/track-1.mp3",
+    }
+    music.update(overrides)
+    return music
+
+
+def legacy_row(*dropped):
+    return {key: value for key, value in long_form().items() if key not in dropped}
+
+
+def low_level(item):
+    serializer = TypeSerializer()
+    return {key: serializer.serialize(value) for key, value in item.items()}
+
+
+def test_v2_round_trip():
+    music = long_form()
+    item = encode_item(music)
+    assert item['v'] == SCHEMA_VERSION
+    assert 'k' not in item and 'file_url' not in item and 'title' not in item
+    assert decode_item(item, BUCKET) == music
+
+
+def test_v2_round_trip_keeps_non_canonical_key():
+    music = long_form(s3_key='music/track-1.mp3', file_url=f"https://{BUCKET}.s3.amazonaws.com/music/track-1.mp3")
+    item = encode_item(music)
+    assert item['k'] == 'music/track-1.mp3'
+    assert decode_item(item, BUCKET) == music
+
+
+def test_v2_round_trip_empty_album():
+    item = encode_item(long_form(album=''))
+    assert 'al' not in item
+    assert decode_item(item, BUCKET)['album'] == ''
+
+
+def test_v2_keeps_index_and_cover_attributes():
+    item = encode_item({**long_form(), 'upload_bucket': '2026-10#1', 'cv': 'abc123'})
+    assert item['upload_bucket'] == '2026-10#1'
+    assert item['cv'] == 'abc123'
+    music = decode_item(item, BUCKET)
+    assert 'upload_bucket' not in music and 'cv' not in music
+
+
+def test_v1_decode_passes_through():
+    assert decode_item(legacy_row(), BUCKET) == long_form()
+
+
+def test_v1_decode_derives_legacy_key():
+    music = decode_item(legacy_row('s3_key', 'file_url'), BUCKET)
+    assert music['s3_key'] == 'music/track-1.mp3'
+    assert music['file_url'] == f"https://{BUCKET}.s3.amazonaws.com/music/track-1.mp3"
+
+
+def test_v1_to_v2_to_long_form():
+    legacy = decode_item(legacy_row('s3_key', 'file_url'), BUCKET)
+    assert decode_item(encode_item(legacy), BUCKET) == legacy
+
+
+@pytest.mark.parametrize("encode", [False, True])
+def test_cover_url(encode):
+    row = {**long_form(), 'cv': 'abc123'}
+    if encode:
+        row = encode_item(row)
+    assert decode_item(row, BUCKET)['cover_url'] == f"https://{COVERS}/track-1/abc123/160.webp"
+
+
+def test_no_cover_url_without_cv():
+    assert 'cover_url' not in decode_item(encode_item(long_form()), BUCKET)
+
+
+def test_cover_keys_follow_version():
+    keys = music_items.cover_keys('track-1', 'abc123')
+    assert len(keys) == 6
+    assert 'covers/track-1/abc123/160.webp' in keys
+
+
+@pytest.mark.parametrize("row", [
+    long_form(),
+    legacy_row('s3_key', 'file_url', 'album'),
+    encode_item(long_form()),
+    encode_item(long_form(album='', s3_key='music/elsewhere.mp3')),
+    {**encode_item(long_form()), 'cv': 'abc123', 'upload_bucket': '2026-10#1'},
+    {**long_form(), 'cv': 'abc123'},
+])
+def test_music_record_matches_decode_item(row):
+    expected = decode_item(row, BUCKET)
+    expected.pop('s3_key')
+    expected.setdefault('cover_url', None)
+    expected.setdefault('album', None)
+    expected['duration'] = int(expected['duration'])
+    assert music_from_attributes(low_level(row)).to_response(BUCKET) == expected
@@ -0,0 +1,76 @@
+from reconcile_orphans import cover_group, diff_covers, diff_sorted
+
+
+def diff(objects, rows):
+    return list(diff_sorted(iter(objects), iter(rows)))
+
+
+def test_diff_sorted_reports_both_sides():
+    objects = [('music/a.mp3', 't1'), ('music/b.mp3', 't2'), ('music/d.mp3', 't4')]
+    rows = [('music/a.mp3', 'a', 'u1'), ('music/c.mp3', 'c', 'u3'), ('music/d.mp3', 'd', 'u4')]
+    assert diff(objects, rows) == [
+        ('object', 'music/b.mp3', 't2'),
+        ('row', 'music/c.mp3', 'c', 'u3'),
+    ]
+
+
+def test_diff_sorted_duplicate_row_keys_share_one_object():
+    objects = [('music/a.mp3', 't1'), ('music/b.mp3', 't2')]
+    rows = [('music/a.mp3', 'a1', 'u1'), ('music/a.mp3', 'a2', 'u2'), ('music/b.mp3', 'b', 'u3')]
+    assert diff(objects, rows) == []
+
+
+def test_diff_sorted_duplicate_row_keys_without_object():
+    rows = [('music/a.mp3', 'a1', 'u1'), ('music/a.mp3', 'a2', 'u2')]
+    assert diff([('music/b.mp3', 't2')], rows) == [
+        ('row', 'music/a.mp3', 'a1', 'u1'),
+        ('row', 'music/a.mp3', 'a2', 'u2'),
+        ('object', 'music/b.mp3', 't2'),
+    ]
+
+
+def test_diff_sorted_empty_sides():
+    assert diff([], [('music/a.mp3', 'a', 'u1')]) == [('row', 'music/a.mp3', 'a', 'u1')]
+    assert diff([('music/a.mp3', 't1')], []) == [('object', 'music/a.mp3', 't1')]
+
+
+def covers(*entries):
+    # Rows' cover entries as the table scan emits them, sorted by cover group
+    return iter(sorted((cover_group(music_id), live) for music_id, live in entries))
+
+
+def objects(*keys):
+    # S3 lists keys in plain byte order
+    return iter((key, 'modified') for key in sorted(keys))
+
+
+def orphans(keys, entries):
+    return [key for key, _ in diff_covers(objects(*keys), covers(*entries))]
+
+
+def test_diff_covers_keeps_live_directory():
+    keys = ['covers/a/v1/64.jpg', 'covers/a/v1/160.webp']
+    assert orphans(keys, [('a', 'covers/a/v1/')]) == []
+
+
+def test_diff_covers_reports_replaced_and_deleted_tracks():
+    keys = ['covers/a/v1/64.jpg', 'covers/a/v2/64.jpg', 'covers/gone/v1/64.jpg']
+    assert orphans(keys, [('a', 'covers/a/v2/')]) == ['covers/a/v1/64.jpg', 'covers/gone/v1/64.jpg']
+
+
+def test_diff_covers_reports_rows_without_cover():
+    assert orphans(['covers/a/v1/64.jpg'], [('a', '')]) == ['covers/a/v1/64.jpg']
+
+
+def test_diff_covers_group_ordering_across_dash_and_slash():
+    # S3 lists covers/a-b/... before covers/a/... ('-' < '/'), and cover groups
+    # "a-b/" < "a/" sort the same way, so neither track's art is misattributed
+    keys = ['covers/a/v1/64.jpg', 'covers/a-b/v2/64.jpg', 'covers/a-b/v1/64.jpg']
+    entries = [('a', 'covers/a/v1/'), ('a-b', 'covers/a-b/v2/')]
+    assert orphans(keys, entries) == ['covers/a-b/v1/64.jpg']
+
+
+def test_diff_covers_reports_unversioned_thumbnails():
+    # Thumbnails written directly under covers/<music_id>/ are never a live directory
+    keys = ['covers/a/64.jpg', 'covers/a/v1/64.jpg']
+    assert orphans(keys, [('a', 'covers/a/v1/')]) == ['covers/a/64.jpg']
@@ -0,0 +1,97 @@
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+from botocore.stub import ANY, Stubber
+
+import upload_batch_handler
+from upload_batch_handler import music_ids_for
+
+TABLE = "audiobyte-metadata-test"
+IDEMPOTENCY_TABLE = "audiobyte-idempotency-test"
+TOKEN_ID = "user-1#album-token"
+
+
+@pytest.fixture
+def stubber(monkeypatch):
+    monkeypatch.setenv('BUCKET_NAME', 'audiobyte-music-test')
+    monkeypatch.setenv('TABLE_NAME', TABLE)
+    monkeypatch.setenv('IDEMPOTENCY_TABLE_NAME', IDEMPOTENCY_TABLE)
+    # Presigning is local but needs credentials; the URL only has to name the key
+    monkeypatch.setattr(upload_batch_handler, 'presign_upload', lambda bucket, key: f"https://{bucket}/{key}")
+    with Stubber(upload_batch_handler.dynamodb.meta.client) as stub:
+        yield stub
+        stub.assert_no_pending_responses()
+
+
+def event(*titles):
+    return {
+        'identity': {'claims': {'sub': 'user-1', 'cognito:username': 'listener'}},
+        'arguments': {'client_token': 'album-token', 'tracks': [{'title': title} for title in titles]}
+    }
+
+
+def token_lookup():
+    return {'TableName': IDEMPOTENCY_TABLE, 'Key': {'token_id': TOKEN_ID}, 'ConsistentRead': True}
+
+
+def token_record(uploads):
+    serializer = TypeSerializer()
+    return {'Item': {'token_id': {'S': TOKEN_ID}, 'uploads': serializer.serialize(uploads)}}
+
+
+def stored_uploads(*titles):
+    return [
+        {'music_id': music_id, 's3_key': f"music/user-1/{music_id}.mp3", 'title': title}
+        for music_id, title in zip(music_ids_for('user-1', 'album-token', len(titles)), titles)
+    ]
+
+
+def test_music_ids_are_deterministic_per_token():
+    ids = music_ids_for('user-1', 'album-token', 3)
+    assert ids == music_ids_for('user-1', 'album-token', 3)
+    assert len(set(ids)) == 3
+    assert music_ids_for('user-1', 'album-token', 2) == ids[:2]
+    assert music_ids_for('user-2', 'album-token', 3) != ids
+    assert music_ids_for('user-1', 'other-token', 3) != ids
+
+
+def test_music_ids_without_token_are_random():
+    assert music_ids_for('user-1', None, 2) != music_ids_for('user-1', None, 2)
+
+
+def test_first_request_writes_rows_and_token_together(stubber):
+    stubber.add_response('get_item', {}, token_lookup())
+    stubber.add_response('transact_write_items', {}, {'TransactItems': ANY})
+
+    response = upload_batch_handler.handler(event('One', 'Two'), None)
+    assert response['replayed'] is False
+    assert [upload['music_id'] for upload in response['uploads']] == music_ids_for('user-1', 'album-token', 2)
+
+
+def test_replays_a_finished_batch(stubber):
+    uploads = stored_uploads('One', 'Two')
+    stubber.add_response('get_item', token_record(uploads), token_lookup())
+
+    response = upload_batch_handler.handler(event('One', 'Two'), None)
+    assert response['replayed'] is True
+    assert [upload['music_id'] for upload in response['uploads']] == [upload['music_id'] for upload in uploads]
+    assert response['uploads'][0]['upload_url'].endswith(uploads[0]['s3_key'])
+
+
+def test_replays_after_losing_a_concurrent_transaction(stubber):
+    uploads = stored_uploads('One', 'Two')
+    stubber.add_response('get_item', {}, token_lookup())
+    stubber.add_client_error('transact_write_items', service_error_code='TransactionCanceledException')
+    stubber.add_response('get_item', token_record(uploads), token_lookup())
+
+    response = upload_batch_handler.handler(event('One', 'Two'), None)
+    assert response['replayed'] is True
+    assert [upload['music_id'] for upload in response['uploads']] == [upload['music_id'] for upload in uploads]
+
+
+def test_cancelled_transaction_without_token_record_fails(stubber):
+    stubber.add_response('get_item', {}, token_lookup())
+    stubber.add_client_error('transact_write_items', service_error_code='TransactionCanceledException')
+    stubber.add_response('get_item', {}, token_lookup())
+
+    with pytest.raises(Exception, match='Failed to create music batch'):
+        upload_batch_handler.handler(event('One'), None)